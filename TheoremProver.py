@@ -5,45 +5,192 @@
 # 2017, 2021 Kardi Teknomo 
 
 from prover import *
+from knowledge import KnowledgeBase
+from multiprocessing import Pool
+import argparse
+import os
+import re
+import sys
 
 ##############################################################################
 # Command-line interface
 ##############################################################################
 
+# position is the offset in the input where parsing failed, if it is known
 class InvalidInputError(Exception):
-  def __init__(self, message):
+  def __init__(self, message, position=None):
     self.message = message
+    self.position = position
+
+  # the message, with the offset if it is known
+  def __str__(self):
+    if self.position is None:
+      return self.message
+    return '%s (at offset %d)' % (self.message, self.position)
+
+# identifiers are runs of letters and digits, and any other character which
+# is not whitespace is a symbol of its own
+TOKEN_PATTERN = re.compile(r'[^\W_]+|\S')
 
 def lex(inp):
   # perform a lexical analysis
-  tokens = []
-  pos = 0
-  while pos < len(inp):
-    # skip whitespace
-    if inp[pos] == ' ':
-      pos += 1
-      continue
-
-    # identifiers
-    identifier = ''
-    while pos < len(inp) and inp[pos].isalnum():
-      identifier += inp[pos]
-      pos += 1
-    if len(identifier) > 0:
-      tokens.append(identifier)
-      continue
+  return TOKEN_PATTERN.findall(inp)
+
+# the tokens with their offsets in the input, as they are found
+def tokenize(inp):
+  for match in TOKEN_PATTERN.finditer(inp):
+    yield match.group(), match.start()
+
+KEYWORDS = ['not', 'implies', 'and', 'or', 'forall', 'exists']
+
+# the binary connectives and their precedences; they all associate to the
+# right, and a quantifier or NOT binds tighter than any of them but the
+# formula after a quantifier's dot extends as far as it can
+CONNECTIVES = {
+  'implies': (1, Implies),
+  'or': (2, Or),
+  'and': (3, And)
+}
+
+class UnparsableError(Exception):
+  def __init__(self, position):
+    self.position = position
+
+# parses a stream of (token, offset) pairs in one pass, by precedence
+# climbing over an operator stack; terms and formulae are parsed alike and
+# told apart when they are type checked
+class Parser:
+  def __init__(self, pairs):
+    self.pairs = iter(pairs)
+    self.read = []
+    self.lookahead = None
+    self.position = 0
+    self.variables = 0
+    self.advance()
+
+  # move to the next pair; at the end, the offset is the end of the input
+  def advance(self):
+    token, position = self.lookahead, self.position
+    if token is not None:
+      self.read.append(token)
+      if position is not None:
+        position += len(token)
+    self.lookahead, self.position = next(self.pairs, (None, position))
+
+  def peek(self):
+    return self.lookahead
+
+  def next(self):
+    token = self.lookahead
+    self.advance()
+    return token
+
+  def expect(self, token):
+    if self.lookahead != token:
+      raise UnparsableError(self.position)
+    self.advance()
+
+  # a formula, up to the first token which does not continue it
+  def formula(self):
+    operands = [self.unary()]
+    operators = []
+    while self.lookahead in CONNECTIVES:
+      precedence, connective = CONNECTIVES[self.next()]
+      while len(operators) > 0 and operators[-1][0] > precedence:
+        self.reduce(operands, operators)
+      operators.append((precedence, connective))
+      operands.append(self.unary())
+    while len(operators) > 0:
+      self.reduce(operands, operators)
+    return operands[0]
+
+  def reduce(self, operands, operators):
+    precedence, connective = operators.pop()
+    formula_b = operands.pop()
+    operands[-1] = connective(operands[-1], formula_b)
+
+  def unary(self):
+    position = self.position
+    token = self.next()
+    if token == 'not':
+      return Not(self.unary())
+    if token == 'forall' or token == 'exists':
+      # the variables end at the first dot, so they cannot have quantifiers
+      if self.variables > 0:
+        raise UnparsableError(position)
+      self.variables += 1
+      variables = self.list('.')
+      self.variables -= 1
+      formula = self.formula()
+      quantifier = ForAll if token == 'forall' else ThereExists
+      for variable in reversed(variables):
+        formula = quantifier(variable, formula)
+      return formula
+    if token == '(':
+      formula = self.formula()
+      self.expect(')')
+      return formula
+    if token is None or not token.isalnum() or token.lower() in KEYWORDS:
+      raise UnparsableError(position)
+    predicate = any([c.isupper() for c in token])
+    terms = []
+    if self.lookahead == '(':
+      self.advance()
+      if self.lookahead == ')':
+        self.advance()
+      else:
+        terms = self.list(')')
+    elif not predicate:
+      return Variable(token)
+    if predicate:
+      return Predicate(token, terms)
+    return Function(token, terms)
+
+  # formulae separated by commas, and the token after them
+  def list(self, end):
+    formulae = [self.formula()]
+    while self.lookahead == ',':
+      self.advance()
+      formulae.append(self.formula())
+    self.expect(end)
+    return formulae
+
+  # all the tokens, read or not
+  def tokens(self):
+    if self.lookahead is None:
+      return self.read
+    return self.read + [self.lookahead] + \
+      [token for token, position in self.pairs]
+
+# parses a stream of (token, offset) pairs, as from tokenize(); if they are
+# not a formula, the error has the offset of the first token which cannot be
+# part of one, or of the end of the last token
+def parsePairs(pairs):
+  parser = Parser(pairs)
+  try:
+    formula = parser.formula()
+    if parser.peek() is not None:
+      raise UnparsableError(parser.position)
+    return formula
+  except UnparsableError as failure:
+    try:
+      return reparse(parser.tokens())
+    except InvalidInputError as error:
+      error.position = failure.position
+      raise
 
-    # symbols
-    tokens.append(inp[pos])
-    pos += 1
+def parse(tokens):
+  return parsePairs([(token, None) for token in tokens])
 
-  # return the tokens
-  return tokens
+def parseText(inp):
+  return parsePairs(tokenize(inp))
 
-def parse(tokens):
-  # keywords
-  keywords = ['not', 'implies', 'and', 'or', 'forall', 'exists']
-  tokens = [(token.lower() if token in keywords else token)
+# the original parser, which splits the tokens at the first connective of
+# lowest precedence and parses the pieces; it slices and rescans the tokens
+# at every level, so it only runs when the parser fails, to report what is
+# wrong with the tokens in the words it always has
+def reparse(tokens):
+  tokens = [(token.lower() if token in KEYWORDS else token)
     for token in tokens]
 
   # empty formula
@@ -76,11 +223,11 @@ def parse(tokens):
           break
       if i == end:
         raise InvalidInputError('Missing variable in FORALL quantifier.')
-      args.append(parse(tokens[i:end]))
+      args.append(reparse(tokens[i:end]))
       i = end + 1
     if len(tokens) == dot_pos + 1:
       raise InvalidInputError('Missing formula in FORALL quantifier.')
-    formula = parse(tokens[dot_pos + 1:])
+    formula = reparse(tokens[dot_pos + 1:])
     for variable in reversed(args):
       formula = ForAll(variable, formula)
     return formula
@@ -113,11 +260,11 @@ def parse(tokens):
           break
       if i == end:
         raise InvalidInputError('Missing variable in exists quantifier.')
-      args.append(parse(tokens[i:end]))
+      args.append(reparse(tokens[i:end]))
       i = end + 1
     if len(tokens) == dot_pos + 1:
       raise InvalidInputError('Missing formula in exists quantifier.')
-    formula = parse(tokens[dot_pos + 1:])
+    formula = reparse(tokens[dot_pos + 1:])
     for variable in reversed(args):
       formula = ThereExists(variable, formula)
     return formula
@@ -151,8 +298,8 @@ def parse(tokens):
     if not quantifier_in_left:
       if implies_pos == 0 or implies_pos == len(tokens) - 1:
         raise InvalidInputError('Missing formula in IMPLIES connective.')
-      return Implies(parse(tokens[0:implies_pos]),
-        parse(tokens[implies_pos+1:]))
+      return Implies(reparse(tokens[0:implies_pos]),
+        reparse(tokens[implies_pos+1:]))
 
   # Or
   or_pos = None
@@ -183,7 +330,7 @@ def parse(tokens):
     if not quantifier_in_left:
       if or_pos == 0 or or_pos == len(tokens) - 1:
         raise InvalidInputError('Missing formula in OR connective.')
-      return Or(parse(tokens[0:or_pos]), parse(tokens[or_pos+1:]))
+      return Or(reparse(tokens[0:or_pos]), reparse(tokens[or_pos+1:]))
 
   # And
   and_pos = None
@@ -214,16 +361,16 @@ def parse(tokens):
     if not quantifier_in_left:
       if and_pos == 0 or and_pos == len(tokens) - 1:
         raise InvalidInputError('Missing formula in AND connective.')
-      return And(parse(tokens[0:and_pos]), parse(tokens[and_pos+1:]))
+      return And(reparse(tokens[0:and_pos]), reparse(tokens[and_pos+1:]))
 
   # Not
   if tokens[0] == 'not':
     if len(tokens) < 2:
       raise InvalidInputError('Missing formula in NOT connective.')
-    return Not(parse(tokens[1:]))
+    return Not(reparse(tokens[1:]))
 
   # Function
-  if tokens[0].isalnum() and tokens[0].lower() not in keywords and \
+  if tokens[0].isalnum() and tokens[0].lower() not in KEYWORDS and \
     len(tokens) > 1 and not any([c.isupper() for c in tokens[0]]) and \
     tokens[1] == '(':
     if tokens[-1] != ')':
@@ -247,15 +394,15 @@ def parse(tokens):
             break
         if i == end:
           raise InvalidInputError('Missing function argument.')
-        args.append(parse(tokens[i:end]))
+        args.append(reparse(tokens[i:end]))
         i = end + 1
     return Function(name, args)
 
   # Predicate
-  if tokens[0].isalnum() and tokens[0].lower() not in keywords and \
+  if tokens[0].isalnum() and tokens[0].lower() not in KEYWORDS and \
     len(tokens) == 1 and any([c.isupper() for c in tokens[0]]):
     return Predicate(tokens[0], [])
-  if tokens[0].isalnum() and tokens[0].lower() not in keywords and \
+  if tokens[0].isalnum() and tokens[0].lower() not in KEYWORDS and \
     len(tokens) > 1 and any([c.isupper() for c in tokens[0]]) and \
     tokens[1] == '(':
     if tokens[-1] != ')':
@@ -279,12 +426,12 @@ def parse(tokens):
             break
         if i == end:
           raise InvalidInputError('Missing predicate argument.')
-        args.append(parse(tokens[i:end]))
+        args.append(reparse(tokens[i:end]))
         i = end + 1
     return Predicate(name, args)
 
   # Variable
-  if tokens[0].isalnum() and tokens[0].lower() not in keywords and \
+  if tokens[0].isalnum() and tokens[0].lower() not in KEYWORDS and \
     len(tokens) == 1 and not any([c.isupper() for c in tokens[0]]):
     return Variable(tokens[0])
 
@@ -294,7 +441,7 @@ def parse(tokens):
       raise InvalidInputError('Missing \')\'.')
     if len(tokens) == 2:
       raise InvalidInputError('Missing formula in parenthetical group.')
-    return parse(tokens[1:-1])
+    return reparse(tokens[1:-1])
 
   raise InvalidInputError('Unable to parse: %s...' % tokens[0])
 
@@ -387,88 +534,108 @@ def help():
     print(s)
     return s
 
-def interactive():
-  axioms = set()
-  lemmas = {}
+def formatResult(kind, formula, result, exhausted):
+  if result is None:
+    return '%s unknown: %s (%s).' % (kind, formula, exhausted)
+  if result:
+    return '%s proven: %s.' % (kind, formula)
+  return '%s unprovable: %s.' % (kind, formula)
+
+# runs one statement (a command or a formula) against the knowledge base and
+# returns its lines of output; lemmas and formulae are proven by proveFormula
+# under the limits, with the engine and the cache, and log, if given, is
+# called to make the proof log of each search; a (formula, SearchStatistics,
+# proof log) triple is appended to searches, if given, for each search; if a
+# queue (a BatchQueue) is given, formulae are added to it instead, and the
+# line of each is the placeholder the queue returns for it
+def statementLines(inp, knowledge, limits=None, log=None, engine='sequent',
+  cache=None, searches=None, queue=None):
+  axioms = knowledge.axioms
+  lemmas = knowledge.lemmas
+  commands = ['axiom', 'lemma', 'axioms', 'lemmas', 'remove', 'reset']
+  pairs = [((token.lower() if token in commands else token), position)
+    for token, position in tokenize(inp)]
+  tokens = [token for token, position in pairs]
+  for token, position in pairs[1:]:
+    if token in commands:
+      raise InvalidInputError('Unexpected keyword: %s.' % token, position)
+  if len(tokens) > 0 and tokens[0] in ['axioms', 'lemmas', 'reset']:
+    if len(tokens) > 1:
+      raise InvalidInputError('Unexpected: %s.' % tokens[1], pairs[1][1])
+    if tokens[0] == 'axioms':
+      return [str(axiom) for axiom in axioms]
+    if tokens[0] == 'lemmas':
+      return [str(lemma) for lemma in lemmas]
+    if queue is not None:
+      queue.submit()
+    axioms.clear()
+    lemmas.clear()
+    return []
+  if len(tokens) > 0 and tokens[0] in ['axiom', 'lemma', 'remove']:
+    formula = parsePairs(pairs[1:])
+  else:
+    formula = parsePairs(pairs)
+  check_formula(formula)
+  if len(tokens) == 0 or tokens[0] not in ['axiom', 'lemma', 'remove']:
+    if queue is not None:
+      return [queue.add(formula, knowledge)]
+  elif queue is not None:
+    # the formulae queued so far are proven from the axioms and lemmas as
+    # they are before this statement
+    queue.submit()
+  if len(tokens) > 0 and tokens[0] == 'axiom':
+    axioms.add(formula)
+    return ['Axiom added: %s.' % formula]
+  if len(tokens) > 0 and tokens[0] == 'remove':
+    if formula in axioms:
+      axioms.remove(formula)
+      bad_lemmas = [lemma for lemma, dependent_axioms in lemmas.items()
+        if formula in dependent_axioms]
+      for lemma in bad_lemmas:
+        del lemmas[lemma]
+      lines = ['Axiom removed: %s.' % formula]
+      if len(bad_lemmas) == 1:
+        lines.append('This lemma was proven using that ' \
+          'axiom and was also removed:')
+      if len(bad_lemmas) > 1:
+        lines.append('These lemmas were proven using that ' \
+          'axiom and were also removed:')
+      for lemma in bad_lemmas:
+        lines.append('  %s' % lemma)
+      return lines
+    if formula in lemmas:
+      del lemmas[formula]
+      return ['Lemma removed: %s.' % formula]
+    return ['Not an axiom: %s.' % formula]
+  statistics = SearchStatistics()
+  result,proof = proveFormula(axioms | set(lemmas.keys()), formula, limits,
+    statistics, log and log(), engine=engine, cache=cache)
+  if searches is not None:
+    searches.append((formula, statistics, proof))
+  if len(tokens) > 0 and tokens[0] == 'lemma':
+    if result:
+      lemmas[formula] = axioms.copy()
+    return [formatResult('Lemma', formula, result, statistics.exhausted)]
+  return [formatResult('Formula', formula, result, statistics.exhausted)]
+
+# the statements are run by statementLines; the knowledge base, if given,
+# holds the axioms and lemmas to start from and is updated in place
+def interactive(limits=None, log=None, engine='sequent', cache=None,
+  knowledge=None):
+  if knowledge is None:
+    knowledge = KnowledgeBase()
 
   while True:
     try:
       inp = input('\n> ')
-      commands = ['axiom', 'lemma', 'axioms', 'lemmas', 'remove', 'reset']
-      tokens = [(token.lower() if token in commands else token)
-        for token in lex(inp)]
-      for token in tokens[1:]:
-        if token in commands:
-          raise InvalidInputError('Unexpected keyword: %s.' % token)
-      if len(tokens) > 0 and tokens[0] == 'axioms':
-        if len(tokens) > 1:
-          raise InvalidInputError('Unexpected: %s.' % tokens[1])
-        for axiom in axioms:
-          print(axiom)
-      elif len(tokens) > 0 and tokens[0] == 'lemmas':
-        if len(tokens) > 1:
-          raise InvalidInputError('Unexpected: %s.' % tokens[1])
-        for lemma in lemmas:
-          print(lemma)
-      elif len(tokens) > 0 and tokens[0] == 'axiom':
-        formula = parse(tokens[1:])
-        check_formula(formula)
-        axioms.add(formula)
-        print('Axiom added: %s.' % formula)
-      elif len(tokens) > 0 and tokens[0] == 'lemma':
-        formula = parse(tokens[1:])
-        check_formula(formula)
-        result = proveFormula(axioms | set(lemmas.keys()), formula)
-        if result:
-          lemmas[formula] = axioms.copy()
-          print('Lemma proven: %s.' % formula)
-        else:
-          print('Lemma unprovable: %s.' % formula)
-      elif len(tokens) > 0 and tokens[0] == 'remove':
-        formula = parse(tokens[1:])
-        check_formula(formula)
-        if formula in axioms:
-          axioms.remove(formula)
-          bad_lemmas = []
-          for lemma, dependent_axioms in lemmas.items():
-            if formula in dependent_axioms:
-              bad_lemmas.append(lemma)
-          for lemma in bad_lemmas:
-            del lemmas[lemma]
-          print('Axiom removed: %s.' % formula)
-          if len(bad_lemmas) == 1:
-            print('This lemma was proven using that ' \
-              'axiom and was also removed:')
-            for lemma in bad_lemmas:
-              print('  %s' % lemma)
-          if len(bad_lemmas) > 1:
-            print('These lemmas were proven using that ' \
-              'axiom and were also removed:')
-            for lemma in bad_lemmas:
-              print('  %s' % lemma)
-        elif formula in lemmas:
-          del lemmas[formula]
-          print('Lemma removed: %s.' % formula)
-        else:
-          print('Not an axiom: %s.' % formula)
-      elif len(tokens) > 0 and tokens[0] == 'reset':
-        if len(tokens) > 1:
-          raise InvalidInputError('Unexpected: %s.' % tokens[1])
-        axioms = set()
-        lemmas = {}
-      elif len(tokens) > 0 and (tokens[0] == 'quit' or tokens[0] == 'exit') :
+      tokens = lex(inp)
+      if len(tokens) > 0 and (tokens[0] == 'quit' or tokens[0] == 'exit') :
           print('now I exit interactive mode')
           break
-      else:
-        formula = parse(tokens)
-        check_formula(formula)
-        result = proveFormula(axioms | set(lemmas.keys()), formula)
-        if result:
-          print('Formula proven: %s.' % formula)
-        else:
-          print('Formula unprovable: %s.' % formula)
+      for line in statementLines(inp, knowledge, limits, log, engine, cache):
+        print(line)
     except InvalidInputError as e:
-      print(e.message)
+      print(e)
     except KeyboardInterrupt:
       pass
     except EOFError:
@@ -476,111 +643,212 @@ def interactive():
       break
 
 
-# wrapper to receive a list of axioms and lemmas in a statement
-def prove(statement):
-
-  axioms = set()
-  lemmas = {}
+# wrapper to receive a list of axioms and lemmas in a statement; each is run
+# by statementLines, and the output is printed and returned along with the
+# proof log of the last search; the limits, if given, bound the search for
+# each lemma and formula; log, if given, is called to make the proof log for
+# each search (e.g. NullLog for quiet runs); if processes is given the
+# formulae are proven in parallel by proveBatch, which logs no proofs, so the
+# proof log returned is then a NullLog; engine selects the prover as in
+# proveFormula, and the cache, if given, remembers the answers across calls;
+# the knowledge base, if given, holds the axioms and lemmas to start
+# from and is updated in place; statistics, if given, is a list to which a
+# (formula, SearchStatistics) pair is appended for each lemma and formula, in
+# order
+def prove(statement, limits=None, log=None, processes=None, engine='sequent',
+  cache=None, knowledge=None, statistics=None):
+
+  if processes is not None:
+    output,results = proveBatch(statement, limits, processes, engine, cache,
+      knowledge, statistics)
+    return output,NullLog()
+
+  if knowledge is None:
+    knowledge = KnowledgeBase()
   output=""
+  proof = None
+  searches = []
   for inp in statement:
     try:
-      commands = ['axiom', 'lemma', 'axioms', 'lemmas', 'remove', 'reset']
-      tokens = [(token.lower() if token in commands else token)
-        for token in lex(inp)]
-      for token in tokens[1:]:
-        if token in commands:
-          raise InvalidInputError('Unexpected keyword: %s.' % token)
-      if len(tokens) > 0 and tokens[0] == 'axioms':
-        if len(tokens) > 1:
-          raise InvalidInputError('Unexpected: %s.' % tokens[1])
-        for axiom in axioms:
-          output=output+axiom+"\n"
-          print(axiom)
-      elif len(tokens) > 0 and tokens[0] == 'lemmas':
-        if len(tokens) > 1:
-          raise InvalidInputError('Unexpected: %s.' % tokens[1])
-        for lemma in lemmas:
-          output=output+lemma+'\n'
-          print(lemma)
-      elif len(tokens) > 0 and tokens[0] == 'axiom':
-        formula = parse(tokens[1:])
-        check_formula(formula)
-        axioms.add(formula)
-        output=output+ 'Axiom added: %s.' % formula+'\n'
-        print('Axiom added: %s.' % formula)
-      elif len(tokens) > 0 and tokens[0] == 'lemma':
-        formula = parse(tokens[1:])
-        check_formula(formula)
-        result,proof = proveFormula(axioms | set(lemmas.keys()), formula)
-        if result:
-          lemmas[formula] = axioms.copy()
-          output=output+'Lemma proven: %s.' % formula+'\n'
-          print('Lemma proven: %s.' % formula)
-        else:
-          output=output+'Lemma unprovable: %s.' % formula+'\n'
-          print('Lemma unprovable: %s.' % formula)
-      elif len(tokens) > 0 and tokens[0] == 'remove':
-        formula = parse(tokens[1:])
-        check_formula(formula)
-        if formula in axioms:
-          axioms.remove(formula)
-          bad_lemmas = []
-          for lemma, dependent_axioms in lemmas.items():
-            if formula in dependent_axioms:
-              bad_lemmas.append(lemma)
-          for lemma in bad_lemmas:
-            del lemmas[lemma]
-          output=output+'Axiom removed: %s.' % formula+'\n'
-          print('Axiom removed: %s.' % formula)
-          if len(bad_lemmas) == 1:
-            output=output+'This lemma was proven using that ' \
-              'axiom and was also removed:'+'\n'
-            print('This lemma was proven using that ' \
-              'axiom and was also removed:')
-            for lemma in bad_lemmas:
-              output=output+'  %s' % lemma+'\n'
-              print('  %s' % lemma)
-          if len(bad_lemmas) > 1:
-            print('These lemmas were proven using that ' \
-              'axiom and were also removed:')
-            for lemma in bad_lemmas:
-              output=output+'  %s' % lemma+'\n'
-              print('  %s' % lemma)
-        elif formula in lemmas:
-          del lemmas[formula]
-          output=output+'Lemma removed: %s.' % formula+'\n'
-          print('Lemma removed: %s.' % formula)
-        else:
-          output=output+'Not an axiom: %s.' % formula+'\n'
-          print('Not an axiom: %s.' % formula)
-      elif len(tokens) > 0 and tokens[0] == 'reset':
-        if len(tokens) > 1:
-          raise InvalidInputError('Unexpected: %s.' % tokens[1])
-        axioms = set()
-        lemmas = {}
-      else:
-        formula = parse(tokens)
-        check_formula(formula)
-        result,proof = proveFormula(axioms | set(lemmas.keys()), formula)
-        if result:
-          output=output+'Formula proven: %s.' % formula+'\n'
-          print('Formula proven: %s.' % formula)
-        else:
-          output=output+'Formula unprovable: %s.' % formula+'\n'
-          print('Formula unprovable: %s.' % formula)
+      lines = statementLines(inp, knowledge, limits, log, engine, cache,
+        searches)
     except InvalidInputError as e:
-      output=e.message
-      print(e.message)
+      lines = [str(e)]
     except KeyboardInterrupt:
-      pass
-    except EOFError:
-      output=""
-      print('')
-      break
+      lines = []
+    for formula, search_statistics, proof in searches:
+      if statistics is not None:
+        statistics.append((formula, search_statistics))
+    del searches[:]
+    for line in lines:
+      output = output + line + '\n'
+      print(line)
   return output,proof
 
+##############################################################################
+# Batches
+##############################################################################
+
+# runs in a worker process: proves some formulae from the same axioms and
+# returns the result of each along with the statistics of its search
+def proveGoals(axioms, formulae, limits, engine):
+  results = []
+  for formula in formulae:
+    statistics = SearchStatistics()
+    result,proof = proveFormula(axioms, formula, limits, statistics,
+      NullLog(), engine=engine)
+    results.append((result, statistics))
+  return results
+
+# the formulae of a batch, which are handed to the pool a few chunks at a
+# time (a few per process), each chunk along with the axioms it is proven
+# from; formulae answered by the cache are not sent, and the axioms of each
+# formula are only kept if there is a cache to tell the answer
+class BatchQueue:
+  def __init__(self, pool, processes, limits, engine, cache):
+    self.pool = pool
+    self.processes = processes
+    self.limits = limits
+    self.engine = engine
+    self.cache = cache
+    self.goals = []
+    self.bases = []
+    self.axioms = None
+    self.queued = []
+    self.chunks = []
+    self.cached = {}
+
+  # queues a formula to be proven from the axioms and lemmas of the
+  # knowledge base, which do not change until the next submit; returns the
+  # index of the formula
+  def add(self, formula, knowledge):
+    if self.axioms is None:
+      self.axioms = knowledge.axioms | set(knowledge.lemmas.keys())
+    result = None
+    if self.cache is not None:
+      result = self.cache.get(self.axioms, formula)
+      self.bases.append(self.axioms)
+    if result is None:
+      self.queued.append(len(self.goals))
+    else:
+      self.cached[len(self.goals)] = (result, SearchStatistics())
+    self.goals.append(formula)
+    return len(self.goals) - 1
+
+  # hands the formulae queued so far to the pool
+  def submit(self):
+    size = max(1, -(-len(self.queued) // (self.processes * 4)))
+    for start in range(0, len(self.queued), size):
+      indices = self.queued[start:start + size]
+      self.chunks.append((indices, self.pool.apply_async(proveGoals,
+        (self.axioms, [self.goals[index] for index in indices], self.limits,
+        self.engine))))
+    del self.queued[:]
+    self.axioms = None
+
+  # waits for the pool and returns the result and the statistics of each
+  # formula, in order
+  def results(self):
+    self.submit()
+    results = [None] * len(self.goals)
+    for index, result in self.cached.items():
+      results[index] = result
+    for indices, chunk in self.chunks:
+      for index, result in zip(indices, chunk.get()):
+        results[index] = result
+        if self.cache is not None:
+          self.cache.put(self.bases[index], self.goals[index], result[0])
+    return results
+
+# like prove, but formulae are proven by a pool of processes (one per CPU if
+# processes is 0); a lemma is proven here, in order, because the statements
+# after it may depend on it, while the pool keeps working on the formulae
+# before it; the output is printed in the order of the statement once every
+# result is in, and the results of the formulae are returned in that order;
+# formulae answered by the cache are not sent to the pool; statistics is as
+# in prove
+def proveBatch(statement, limits=None, processes=0, engine='sequent',
+  cache=None, knowledge=None, statistics=None):
+  processes = processes or os.cpu_count() or 1
+  if knowledge is None:
+    knowledge = KnowledgeBase()
+
+  # each line is a string or the index of a formula in the queue, and the
+  # statistics of each lemma are kept by its line
+  lines = []
+  lemma_statistics = {}
+  searches = []
+
+  with Pool(processes) as pool:
+    queue = BatchQueue(pool, processes, limits, engine, cache)
+    for inp in statement:
+      try:
+        statement_lines = statementLines(inp, knowledge, limits, NullLog,
+          engine, cache, searches, queue)
+      except InvalidInputError as e:
+        statement_lines = [str(e)]
+      for formula, search_statistics, proof in searches:
+        lemma_statistics[len(lines)] = (formula, search_statistics)
+      del searches[:]
+      lines.extend(statement_lines)
+    results = queue.results()
+
+  output = ''
+  for position, line in enumerate(lines):
+    if not isinstance(line, str):
+      result, goal_statistics = results[line]
+      if statistics is not None:
+        statistics.append((queue.goals[line], goal_statistics))
+      line = formatResult('Formula', queue.goals[line], result,
+        goal_statistics.exhausted)
+    elif statistics is not None and position in lemma_statistics:
+      statistics.append(lemma_statistics[position])
+    output = output + line + '\n'
+    print(line)
+  return output,[result for result, goal_statistics in results]
+
+
+##############################################################################
+# Streams
+##############################################################################
 
+# like prove, but the statements are read one at a time from any iterable of
+# them (a file, a pipe or a generator) and the lines of output for each are
+# yielded as soon as it is done, so nothing but the knowledge base is kept
+# from one statement to the next; blank lines are skipped, and log is called
+# to make the proof log for each search (NullLog by default, since a log of
+# every step would be as big as the search)
+def proveStream(statements, limits=None, log=NullLog, engine='sequent',
+  cache=None, knowledge=None):
+  if knowledge is None:
+    knowledge = KnowledgeBase()
+  for inp in statements:
+    if len(inp.strip()) == 0:
+      continue
+    try:
+      lines = statementLines(inp, knowledge, limits, log, engine, cache)
+    except InvalidInputError as e:
+      lines = [str(e)]
+    for line in lines:
+      yield line
 
 if __name__ == '__main__':
-  help()
-  interactive()
+  command_line = argparse.ArgumentParser(
+    description='First-order logic theorem prover.')
+  command_line.add_argument('--stream', metavar='FILE',
+    help='prove the statements in FILE (- for standard input), one per ' \
+    'line, printing the results as they are found')
+  command_line.add_argument('--timeout', metavar='SECONDS', type=float,
+    help='give up on each search after SECONDS')
+  arguments = command_line.parse_args()
+  limits = ResourceLimits(timeout=arguments.timeout)
+  if arguments.stream is None:
+    help()
+    interactive(limits)
+  elif arguments.stream == '-':
+    for line in proveStream(sys.stdin, limits):
+      print(line, flush=True)
+  else:
+    with open(arguments.stream, encoding='utf-8') as statements:
+      for line in proveStream(statements, limits):
+        print(line, flush=True)
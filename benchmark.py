@@ -0,0 +1,286 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+# runs proveFormula over fixed problem sets under fixed budgets and reports
+# the outcome, wall time, sequents expanded and peak resident memory of each
+# problem as JSON or CSV, e.g.
+#
+#   python benchmark.py --timeout 10 --format csv --output results.csv
+#
+# each problem runs in a fresh process, so the peak memory is its own; the
+# problem sets are fixed, so runs of different versions can be compared;
+# problems without quantifiers are decided by the SAT solver unless
+# --no-propositional is given, and the engine column says which answered
+
+from prover import *
+from TheoremProver import parseText, check_formula
+from tptp import readTPTP
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+##############################################################################
+# Problem sets
+##############################################################################
+
+# a problem is a family, a name, the axioms, the formula to prove and the
+# expected result (None if it is not known)
+
+# the examples of README.md
+README_EXAMPLES = [
+  ['P and not P'],
+  ['Z or not Z'],
+  ['axiom P implies Q', 'axiom Q implies R', 'axiom P', 'lemma R'],
+  ['axiom P implies Q', 'axiom Q implies R', 'lemma P implies R'],
+  ['axiom P and Q implies R', 'axiom Q and R implies S', 'axiom P',
+    'axiom Q', 'lemma S'],
+  ['axiom A implies B', 'axiom A', 'lemma B'],
+  ['axiom A implies B', 'axiom not B', 'lemma not A'],
+  ['axiom A implies B', 'axiom not A', 'lemma not B'],
+  ['axiom A implies not B', 'axiom A implies B', 'lemma not A'],
+  ['axiom not A', 'axiom not A implies not B', 'lemma B implies A'],
+  ['forall x. P(x) implies (Q(x) implies P(x))'],
+  ['axiom forall x. Men(x) implies Mortal(x)', 'axiom Men(socrates)',
+    'lemma Mortal(socrates)'],
+  ['axiom forall x. Men(x) implies Mortal(x)',
+    'axiom forall x. Greek(x) implies Men(x)',
+    'lemma forall x. (Greek(x) implies Mortal(x))'],
+  ['exists x. (P(x) implies forall y. P(y))'],
+  ['axiom forall x. Equals(x, x)', 'lemma Equals(a, a)'],
+  ['axiom forall x. Rabbit(x) implies HaveFur',
+    'axiom exists x. Pet(x) implies Rabbit(x)',
+    'lemma exists x. Pet(x) implies HaveFur'],
+  ['axiom not forall x. Homework(x) implies Fun',
+    'axiom exists x. (Reading(x) implies Homework(x))',
+    'lemma exists x. Reading(x) implies not Fun'],
+  ['axiom Married(alex)', 'axiom forall x. Married(x) implies HaveSpouse(x)',
+    'lemma HaveSpouse(alex)'],
+  ['axiom Farmer(mac)', 'axiom Rabbit(pete)', 'axiom Mother(mrsmac, mac)',
+    'axiom Mother(mrsrabbit, pete)',
+    'axiom forall r. forall f. Rabbit(r) and Farmer(f) implies Hates(f, r)',
+    'axiom forall m. forall c. (Mother(m, c)) implies Loves(m, c)',
+    'axiom forall m. forall r. (Mother(m, r) and Rabbit(r) implies ' \
+      'Rabbit(m))',
+    'axiom forall f. Farmer(f) implies Human(f)',
+    'axiom forall m. forall h. Mother(m, h) and Human(h) implies Human(m)',
+    'lemma Hates(mac, pete)']
+]
+
+def parsed(text):
+  formula = parseText(text)
+  check_formula(formula)
+  return formula
+
+# a problem for each lemma or formula of each example, with the axioms and
+# the lemmas before it
+def readmeProblems():
+  for number, statement in enumerate(README_EXAMPLES):
+    axioms = []
+    for inp in statement:
+      if inp.startswith('axiom '):
+        axioms.append(parsed(inp[len('axiom '):]))
+        continue
+      goal = parsed(inp[len('lemma '):] if inp.startswith('lemma ') \
+        else inp)
+      yield ('readme', 'example%d' % (number + 1), list(axioms), goal, None)
+      axioms.append(goal)
+
+# A0, A0 implies A1, ..., A(n-1) implies An proves An
+def implicationChains(sizes=(10, 100, 1000, 10000)):
+  for n in sizes:
+    axioms = [parsed('A0')] + [parsed('A%d implies A%d' % (i, i + 1))
+      for i in range(n)]
+    yield ('implication-chain', 'n%d' % n, axioms, parsed('A%d' % n), True)
+
+# the same chain of unary predicates, quantified over a constant
+def quantifiedChains(sizes=(2, 4, 8, 16)):
+  for n in sizes:
+    axioms = [parsed('P0(c)')] + [parsed(
+      'forall x. P%d(x) implies P%d(x)' % (i, i + 1)) for i in range(n)]
+    yield ('quantified-chain', 'n%d' % n, axioms, parsed('P%d(c)' % n),
+      True)
+
+# n + 1 pigeons do not fit in n holes: the axioms are inconsistent, so they
+# prove anything
+def pigeonholes(sizes=(2, 3, 4, 5, 6)):
+  for n in sizes:
+    axioms = [parsed(' or '.join(['In%dx%d' % (pigeon, hole)
+      for hole in range(n)])) for pigeon in range(n + 1)]
+    for hole in range(n):
+      for pigeon in range(n + 1):
+        for other in range(pigeon + 1, n + 1):
+          axioms.append(parsed('not (In%dx%d and In%dx%d)' %
+            (pigeon, hole, other, hole)))
+    yield ('pigeonhole', 'n%d' % n, axioms, parsed('Absurd'), True)
+
+# formulae whose quantifiers grow with n
+def quantifierFamilies(sizes=(1, 2, 3, 4)):
+  for n in sizes:
+    xs = ['x%d' % i for i in range(n)]
+    ys = ['y%d' % i for i in range(n)]
+
+    # the universal quantifiers in the opposite order
+    yield ('quantifier-swap', 'n%d' % n, [], parsed(
+      '(%s R(%s)) implies (%s R(%s))' % (
+      ' '.join(['forall %s.' % x for x in xs]), ', '.join(xs),
+      ' '.join(['forall %s.' % x for x in reversed(xs)]), ', '.join(xs))),
+      True)
+
+    # exists forall implies forall exists
+    yield ('quantifier-alternation', 'n%d' % n, [], parsed(
+      '(exists z. %s R(z, %s)) implies (%s exists z. R(z, %s))' % (
+      ' '.join(['forall %s.' % y for y in ys]), ', '.join(ys),
+      ' '.join(['forall %s.' % y for y in ys]), ', '.join(ys))), True)
+
+    # the drinker paradox for a conjunction of n predicates
+    yield ('drinker', 'n%d' % n, [], parsed(
+      'exists x. ((%s) implies forall y. (%s))' % (
+      ' and '.join(['D%d(x)' % i for i in range(n)]),
+      ' and '.join(['D%d(y)' % i for i in range(n)]))), True)
+
+# the problems in TPTP files; the expected result follows from the status
+def tptpProblems(paths):
+  statuses = {
+    'Theorem': True,
+    'Unsatisfiable': True,
+    'ContradictoryAxioms': True,
+    'CounterSatisfiable': False,
+    'Satisfiable': False
+  }
+  for path in paths:
+    if os.path.isdir(path):
+      files = sorted(glob.glob(os.path.join(path, '*.p')))
+    else:
+      files = [path]
+    for name in files:
+      problem = readTPTP(name)
+      yield ('tptp', problem.name, problem.axioms, problem.goal(),
+        statuses.get(problem.status))
+
+PROBLEM_SETS = {
+  'readme': readmeProblems,
+  'implication-chain': implicationChains,
+  'quantified-chain': quantifiedChains,
+  'pigeonhole': pigeonholes,
+  'quantifiers': quantifierFamilies
+}
+
+##############################################################################
+# Runs
+##############################################################################
+
+FIELDS = ['family', 'name', 'engine', 'expected', 'result', 'exhausted',
+  'seconds', 'sequents', 'peak_memory']
+
+# runs in a fresh worker process: proves one problem and returns its record;
+# the engine recorded is the one which answered, which is the SAT solver for
+# a problem without quantifiers unless propositional is False
+def runProblem(arguments):
+  problem, limits, engine, propositional = arguments
+  family, name, axioms, goal, expected = problem
+  statistics = SearchStatistics()
+  start = time.monotonic()
+  result,log = proveFormula(axioms, goal, limits, statistics, NullLog(),
+    propositional=propositional, engine=engine)
+  return {
+    'family': family,
+    'name': name,
+    'engine': statistics.engine,
+    'expected': expected,
+    'result': result,
+    'exhausted': statistics.exhausted,
+    'seconds': round(time.monotonic() - start, 6),
+    'sequents': statistics.sequents,
+    'peak_memory': peakMemory()
+  }
+
+# the workers are spawned rather than forked, so that they do not share the
+# memory of this process
+def runBenchmarks(problems, limits, engine, processes=1, propositional=True):
+  context = multiprocessing.get_context('spawn')
+  with context.Pool(processes, maxtasksperchild=1) as pool:
+    return pool.map(runProblem, [(problem, limits, engine, propositional)
+      for problem in problems], chunksize=1)
+
+def writeJSON(records, limits, propositional, output):
+  json.dump({
+    'python': platform.python_version(),
+    'platform': platform.platform(),
+    'timeout': limits.timeout,
+    'max_sequents': limits.max_sequents,
+    'propositional': propositional,
+    'results': records
+  }, output, indent=2)
+  output.write('\n')
+
+def writeCSV(records, output):
+  writer = csv.DictWriter(output, FIELDS)
+  writer.writeheader()
+  writer.writerows(records)
+
+def main():
+  command_line = argparse.ArgumentParser(
+    description='Benchmark the theorem prover.')
+  command_line.add_argument('--set', action='append',
+    choices=sorted(PROBLEM_SETS), help='run only this problem set (repeatable)')
+  command_line.add_argument('--tptp', action='append', default=[],
+    metavar='PATH', help='also run the TPTP problems in PATH, a .p file or ' \
+    'a directory of them (repeatable)')
+  command_line.add_argument('--timeout', type=float, default=10.0,
+    metavar='SECONDS', help='time budget per problem (default 10)')
+  command_line.add_argument('--max-sequents', type=int, metavar='N',
+    help='sequent budget per problem')
+  command_line.add_argument('--engine', default='sequent',
+    choices=['sequent', 'resolution'])
+  command_line.add_argument('--no-propositional', dest='propositional',
+    action='store_false', help='run the engine on problems without ' \
+    'quantifiers too, instead of the SAT solver')
+  command_line.add_argument('--processes', type=int, default=1,
+    help='problems run at once (more skews the times)')
+  command_line.add_argument('--format', default='json',
+    choices=['json', 'csv'])
+  command_line.add_argument('--output', metavar='FILE',
+    help='write the report to FILE instead of standard output')
+  arguments = command_line.parse_args()
+
+  sets = arguments.set
+  if sets is None:
+    sets = [] if len(arguments.tptp) > 0 else sorted(PROBLEM_SETS)
+  problems = []
+  for name in sets:
+    problems.extend(PROBLEM_SETS[name]())
+  problems.extend(tptpProblems(arguments.tptp))
+  limits = ResourceLimits(timeout=arguments.timeout,
+    max_sequents=arguments.max_sequents)
+  records = runBenchmarks(problems, limits, arguments.engine,
+    arguments.processes, arguments.propositional)
+
+  output = sys.stdout
+  if arguments.output is not None:
+    output = open(arguments.output, 'w', newline='')
+  try:
+    if arguments.format == 'json':
+      writeJSON(records, limits, arguments.propositional, output)
+    else:
+      writeCSV(records, output)
+  finally:
+    if output is not sys.stdout:
+      output.close()
+
+  wrong = [record for record in records if record['expected'] is not None
+    and record['result'] is not None
+    and record['result'] != record['expected']]
+  print('%d problems: %d proven, %d unprovable, %d unknown, %d wrong' % (
+    len(records), sum([record['result'] is True for record in records]),
+    sum([record['result'] is False for record in records]),
+    sum([record['result'] is None for record in records]), len(wrong)),
+    file=sys.stderr)
+
+if __name__ == '__main__':
+  main()
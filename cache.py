@@ -0,0 +1,130 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+from language import *
+from collections import OrderedDict
+from itertools import count
+import dbm
+import hashlib
+import weakref
+
+##############################################################################
+# Fingerprints
+##############################################################################
+
+# rename the bound variables of a formula to #1, #2, ... in the order their
+# quantifiers are met, so that formulae which only differ in the names of
+# bound variables become the same formula (no input variable has a # in it)
+def alphaNormalize(formula, names=None):
+  if names is None:
+    names = count(1)
+  if isinstance(formula, ForAll) or isinstance(formula, ThereExists):
+    variable = Variable('#%d' % next(names))
+    return type(formula)(variable, alphaNormalize(
+      formula.formula.replace(formula.variable, variable), names))
+  if isinstance(formula, Not):
+    return Not(alphaNormalize(formula.formula, names))
+  if isinstance(formula, And) or isinstance(formula, Or) or \
+    isinstance(formula, Implies):
+    return type(formula)(alphaNormalize(formula.formula_a, names),
+      alphaNormalize(formula.formula_b, names))
+  return formula
+
+# an unambiguous text form of a term or formula: str() prints a variable
+# and a constant with the same name alike
+def serialize(node):
+  if isinstance(node, Variable) or isinstance(node, UnificationTerm):
+    return '%s:%s' % (type(node).__name__, node.name)
+  if isinstance(node, Function) or isinstance(node, Predicate):
+    return '%s:%s(%s)' % (type(node).__name__, node.name,
+      ','.join([serialize(term) for term in node.terms]))
+  if isinstance(node, ForAll) or isinstance(node, ThereExists):
+    return '%s(%s,%s)' % (type(node).__name__, serialize(node.variable),
+      serialize(node.formula))
+  if isinstance(node, Not):
+    return 'Not(%s)' % serialize(node.formula)
+  return '%s(%s,%s)' % (type(node).__name__, serialize(node.formula_a),
+    serialize(node.formula_b))
+
+# the digest of each formula seen, as an integer; formulae are interned, so
+# an entry lasts as long as its formula
+digests = weakref.WeakKeyDictionary()
+
+def digest(formula):
+  value = digests.get(formula)
+  if value is None:
+    value = int.from_bytes(hashlib.sha256(
+      serialize(alphaNormalize(formula)).encode('utf-8')).digest(), 'big')
+    digests[formula] = value
+  return value
+
+# a fingerprint of the question whether the formula follows from the axioms;
+# the digests of the axioms are summed, so their order does not matter
+def fingerprint(axioms, formula):
+  total = sum([digest(axiom) for axiom in set(axioms)]) % (1 << 256)
+  return hashlib.sha256(total.to_bytes(32, 'big') +
+    digest(formula).to_bytes(32, 'big')).hexdigest()
+
+##############################################################################
+# Proof cache
+##############################################################################
+
+# remembers whether formulae follow from sets of axioms; the most recently
+# used size answers are kept in memory, and if a path is given every answer
+# is also written to a dbm file there, which is read when the memory misses
+# (so answers survive the process); only definite answers (True or False)
+# are stored, since whether a search runs out of resources depends on the
+# limits it was given
+class ProofCache:
+  def __init__(self, size=1024, path=None):
+    self.size = size
+    self.entries = OrderedDict()
+    self.store = None
+    if path is not None:
+      self.store = dbm.open(path, 'c')
+    self.hits = 0
+    self.misses = 0
+
+  # the answer, or None if there is none
+  def get(self, axioms, formula):
+    key = fingerprint(axioms, formula)
+    result = self.entries.get(key)
+    if result is not None:
+      self.entries.move_to_end(key)
+      self.hits += 1
+      return result
+    if self.store is not None and key in self.store:
+      result = self.store[key] == b'1'
+      self.remember(key, result)
+      self.hits += 1
+      return result
+    self.misses += 1
+    return None
+
+  def put(self, axioms, formula, result):
+    if result is None:
+      return
+    key = fingerprint(axioms, formula)
+    self.remember(key, result)
+    if self.store is not None:
+      self.store[key] = b'1' if result else b'0'
+
+  def remember(self, key, result):
+    self.entries[key] = result
+    self.entries.move_to_end(key)
+    while len(self.entries) > self.size:
+      self.entries.popitem(last=False)
+
+  def close(self):
+    if self.store is not None:
+      self.store.close()
+      self.store = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exception):
+    self.close()
+
+  def __len__(self):
+    return len(self.entries)
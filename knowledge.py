@@ -0,0 +1,173 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+from language import *
+from array import array
+import mmap
+import sys
+
+##############################################################################
+# Knowledge bases
+##############################################################################
+
+# the axioms and the lemmas, each lemma with the axioms it was proven from
+class KnowledgeBase:
+  def __init__(self, axioms=None, lemmas=None):
+    self.axioms = set() if axioms is None else axioms
+    self.lemmas = {} if lemmas is None else lemmas
+
+  def save(self, path):
+    saveKnowledge(path, self.axioms, self.lemmas)
+
+  @staticmethod
+  def load(path):
+    axioms, lemmas = loadKnowledge(path)
+    return KnowledgeBase(axioms, lemmas)
+
+##############################################################################
+# Files
+##############################################################################
+
+# a knowledge base file is the magic bytes followed by little-endian 32-bit
+# words: five counts (bytes of names, node words, nodes, axioms, lemma
+# words), the names separated by newlines and padded to a word, the nodes,
+# the axioms and the lemmas; formulae are interned, so each distinct term
+# and subformula is stored once, as a node whose children come before it:
+#   kind, name                            (variables, unification terms)
+#   kind, name, arity, child, ...         (functions and predicates)
+#   kind, child                           (negations)
+#   kind, child, child                    (the rest)
+# the axioms are node numbers, and each lemma is its node number, the number
+# of axioms it depends on and theirs; the file is memory mapped, and each
+# section is copied out of it once as a list of words
+
+MAGIC = b'FOLKB\x00\x00\x01'
+
+NODE_KINDS = [Variable, UnificationTerm, Function, Predicate, Not, And, Or,
+  Implies, ForAll, ThereExists]
+
+KIND_NUMBERS = { kind: number for number, kind in enumerate(NODE_KINDS) }
+
+# number the nodes of a formula, children first
+def numberNodes(node, numbers, names, words):
+  if node in numbers:
+    return numbers[node]
+  kind = KIND_NUMBERS[type(node)]
+  if isinstance(node, Variable) or isinstance(node, UnificationTerm):
+    fields = [nameNumber(node.name, names)]
+  elif isinstance(node, Function) or isinstance(node, Predicate):
+    fields = [nameNumber(node.name, names), len(node.terms)] + \
+      [numberNodes(term, numbers, names, words) for term in node.terms]
+  elif isinstance(node, Not):
+    fields = [numberNodes(node.formula, numbers, names, words)]
+  elif isinstance(node, ForAll) or isinstance(node, ThereExists):
+    fields = [numberNodes(node.variable, numbers, names, words),
+      numberNodes(node.formula, numbers, names, words)]
+  else:
+    fields = [numberNodes(node.formula_a, numbers, names, words),
+      numberNodes(node.formula_b, numbers, names, words)]
+  words.append(kind)
+  words.extend(fields)
+  numbers[node] = len(numbers)
+  return numbers[node]
+
+def nameNumber(name, names):
+  if name not in names:
+    names[name] = len(names)
+  return names[name]
+
+def saveKnowledge(path, axioms, lemmas):
+  numbers = {}
+  names = {}
+  nodes = array('I')
+  axiom_words = array('I', [numberNodes(axiom, numbers, names, nodes)
+    for axiom in axioms])
+  lemma_words = array('I')
+  for lemma, dependent_axioms in lemmas.items():
+    lemma_words.append(numberNodes(lemma, numbers, names, nodes))
+    lemma_words.append(len(dependent_axioms))
+    for axiom in dependent_axioms:
+      lemma_words.append(numberNodes(axiom, numbers, names, nodes))
+  name_bytes = '\n'.join(names).encode('utf-8')
+  name_bytes += b'\x00' * (-len(name_bytes) % 4)
+  counts = array('I', [len(name_bytes), len(nodes), len(numbers),
+    len(axiom_words), len(lemma_words)])
+  with open(path, 'wb') as output:
+    output.write(MAGIC)
+    output.write(littleEndian(counts).tobytes())
+    output.write(name_bytes)
+    for words in [nodes, axiom_words, lemma_words]:
+      output.write(littleEndian(words).tobytes())
+
+def littleEndian(words):
+  if sys.byteorder == 'big':
+    words = array('I', words)
+    words.byteswap()
+  return words
+
+# returns the axioms and the lemmas saved in the file
+def loadKnowledge(path):
+  with open(path, 'rb') as source:
+    with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+      if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a knowledge base: %s.' % path)
+      view = memoryview(data)
+      try:
+        return readKnowledge(view)
+      finally:
+        view.release()
+
+def readKnowledge(view):
+  position = len(MAGIC)
+  counts = wordsAt(view, position, 5)
+  name_length, node_length, node_count, axiom_count, lemma_length = counts
+  position += 20
+  names = bytes(view[position:position + name_length]).rstrip(b'\x00') \
+    .decode('utf-8').split('\n')
+  position += name_length
+  words = wordsAt(view, position, node_length).tolist()
+  position += 4 * node_length
+
+  # rebuild the nodes in order, so the children are always there already
+  nodes = []
+  index = 0
+  while index < node_length:
+    kind = NODE_KINDS[words[index]]
+    if kind is Variable or kind is UnificationTerm:
+      nodes.append(kind(names[words[index + 1]]))
+      index += 2
+    elif kind is Function or kind is Predicate:
+      arity = words[index + 2]
+      nodes.append(kind(names[words[index + 1]],
+        [nodes[child] for child in words[index + 3:index + 3 + arity]]))
+      index += 3 + arity
+    elif kind is Not:
+      nodes.append(Not(nodes[words[index + 1]]))
+      index += 2
+    else:
+      nodes.append(kind(nodes[words[index + 1]], nodes[words[index + 2]]))
+      index += 3
+  if len(nodes) != node_count:
+    raise ValueError('Corrupt knowledge base.')
+
+  axioms = set([nodes[number]
+    for number in wordsAt(view, position, axiom_count)])
+  position += 4 * axiom_count
+  words = wordsAt(view, position, lemma_length).tolist()
+  lemmas = {}
+  index = 0
+  while index < lemma_length:
+    count = words[index + 1]
+    lemmas[nodes[words[index]]] = set([nodes[number]
+      for number in words[index + 2:index + 2 + count]])
+    index += 2 + count
+  return axioms, lemmas
+
+# a view of the words at a byte offset (a copy if the byte order differs)
+def wordsAt(view, position, length):
+  words = view[position:position + 4 * length]
+  if sys.byteorder == 'big':
+    words = array('I', bytes(words))
+    words.byteswap()
+    return words
+  return words.cast('I')
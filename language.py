@@ -3,14 +3,55 @@
 
 # 2014 Stephan Boyer
 from functools import reduce
+import weakref
+
+##############################################################################
+# Interning
+##############################################################################
+
+# every term and formula is hash-consed: structurally equal nodes are built
+# once, so equality is identity and the hash is computed a single time
+interned_nodes = weakref.WeakValueDictionary()
+
+def intern(cls, *values):
+  key = (cls,) + values
+  node = interned_nodes.get(key)
+  if node is None:
+    node = object.__new__(cls)
+    for field, value in zip(cls.__slots__, values):
+      object.__setattr__(node, field, value)
+    object.__setattr__(node, 'hash', hash(values + (cls.__name__,)))
+    interned_nodes[key] = node
+  return node
+
+# interned nodes are shared between sequents, so they are immutable; the
+# __slots__ of each node class list its constructor arguments in order
+class Node:
+  __slots__ = ('hash', '__weakref__')
+
+  def __setattr__(self, name, value):
+    raise AttributeError('%s is immutable.' % type(self).__name__)
+
+  def __delattr__(self, name):
+    raise AttributeError('%s is immutable.' % type(self).__name__)
+
+  def __reduce__(self):
+    # unpickling goes through the constructor, so it is interned again
+    return (type(self),
+      tuple(getattr(self, field) for field in type(self).__slots__))
+
+  def __hash__(self):
+    return self.hash
+
 ##############################################################################
 # Terms
 ##############################################################################
 
-class Variable:
-  def __init__(self, name):
-    self.name = name
-    self.time = 0
+class Variable(Node):
+  __slots__ = ('name',)
+
+  def __new__(cls, name):
+    return intern(cls, name)
 
   def freeVariables(self):
     return { self }
@@ -26,24 +67,17 @@ class Variable:
   def occurs(self, unification_term):
     return False
 
-  def setInstantiationTime(self, time):
-    self.time = time
-
-  def __eq__(self, other):
-    if not isinstance(other, Variable):
-      return False
-    return self.name == other.name
+  def instantiationTime(self, times):
+    return times.get(self, 0)
 
   def __str__(self):
     return self.name
 
-  def __hash__(self):
-    return hash(str(self))
+class UnificationTerm(Node):
+  __slots__ = ('name',)
 
-class UnificationTerm:
-  def __init__(self, name):
-    self.name = name
-    self.time = 0
+  def __new__(cls, name):
+    return intern(cls, name)
 
   def freeVariables(self):
     return set()
@@ -59,25 +93,18 @@ class UnificationTerm:
   def occurs(self, unification_term):
     return self == unification_term
 
-  def setInstantiationTime(self, time):
-    self.time = time
-
-  def __eq__(self, other):
-    if not isinstance(other, UnificationTerm):
-      return False
-    return self.name == other.name
+  def instantiationTime(self, times):
+    return times.get(self, 0)
 
   def __str__(self):
     return self.name
 
-  def __hash__(self):
-    return hash(str(self))
+class Function(Node):
+  __slots__ = ('name', 'terms')
 
-class Function:
-  def __init__(self, name, terms):
-    self.name = name
-    self.terms = terms
-    self.time = 0
+  def __new__(cls, name, terms):
+    terms = tuple(terms)
+    return intern(cls, name, terms)
 
   def freeVariables(self):
     if len(self.terms) == 0:
@@ -101,21 +128,9 @@ class Function:
   def occurs(self, unification_term):
     return any([term.occurs(unification_term) for term in self.terms])
 
-  def setInstantiationTime(self, time):
-    self.time = time
-    for term in self.terms:
-      term.setInstantiationTime(time)
-
-  def __eq__(self, other):
-    if not isinstance(other, Function):
-      return False
-    if self.name != other.name:
-      return False
-    if len(self.terms) != len(other.terms):
-      return False
-    return all(
-      [self.terms[i] == other.terms[i] for i in range(len(self.terms))]
-    )
+  def instantiationTime(self, times):
+    return max([term.instantiationTime(times) for term in self.terms],
+      default=0)
 
   def __str__(self):
     if len(self.terms) == 0:
@@ -124,17 +139,16 @@ class Function:
       [str(term) for term in self.terms]
     ) + ')'
 
-  def __hash__(self):
-    return hash(str(self))
-
 ##############################################################################
 # Formulae
 ##############################################################################
 
-class Predicate:
-  def __init__(self, name, terms):
-    self.name = name
-    self.terms = terms
+class Predicate(Node):
+  __slots__ = ('name', 'terms')
+
+  def __new__(cls, name, terms):
+    terms = tuple(terms)
+    return intern(cls, name, terms)
 
   def freeVariables(self):
     if len(self.terms) == 0:
@@ -158,21 +172,6 @@ class Predicate:
   def occurs(self, unification_term):
     return any([term.occurs(unification_term) for term in self.terms])
 
-  def __eq__(self, other):
-    if not isinstance(other, Predicate):
-      return False
-    if self.name != other.name:
-      return False
-    if len(self.terms) != len(other.terms):
-      return False
-    return all(
-      [self.terms[i] == other.terms[i] for i in range(len(self.terms))]
-    )
-
-  def setInstantiationTime(self, time):
-    for term in self.terms:
-      term.setInstantiationTime(time)
-
   def __str__(self):
     if len(self.terms) == 0:
       return self.name
@@ -180,12 +179,11 @@ class Predicate:
       [str(term) for term in self.terms]
     ) + ')'
 
-  def __hash__(self):
-    return hash(str(self))
+class Not(Node):
+  __slots__ = ('formula',)
 
-class Not:
-  def __init__(self, formula):
-    self.formula = formula
+  def __new__(cls, formula):
+    return intern(cls, formula)
 
   def freeVariables(self):
     return self.formula.freeVariables()
@@ -201,24 +199,14 @@ class Not:
   def occurs(self, unification_term):
     return self.formula.occurs(unification_term)
 
-  def setInstantiationTime(self, time):
-    self.formula.setInstantiationTime(time)
-
-  def __eq__(self, other):
-    if not isinstance(other, Not):
-      return False
-    return self.formula == other.formula
-
   def __str__(self):
     return '¬' + str(self.formula)
 
-  def __hash__(self):
-    return hash(str(self))
+class And(Node):
+  __slots__ = ('formula_a', 'formula_b')
 
-class And:
-  def __init__(self, formula_a, formula_b):
-    self.formula_a = formula_a
-    self.formula_b = formula_b
+  def __new__(cls, formula_a, formula_b):
+    return intern(cls, formula_a, formula_b)
 
   def freeVariables(self):
     return self.formula_a.freeVariables() | \
@@ -240,26 +228,14 @@ class And:
     return self.formula_a.occurs(unification_term) or \
       self.formula_b.occurs(unification_term)
 
-  def setInstantiationTime(self, time):
-    self.formula_a.setInstantiationTime(time)
-    self.formula_b.setInstantiationTime(time)
-
-  def __eq__(self, other):
-    if not isinstance(other, And):
-      return False
-    return self.formula_a == other.formula_a and \
-      self.formula_b == other.formula_b
-
   def __str__(self):
     return '(%s ∧ %s)' % (self.formula_a, self.formula_b)
 
-  def __hash__(self):
-    return hash(str(self))
+class Or(Node):
+  __slots__ = ('formula_a', 'formula_b')
 
-class Or:
-  def __init__(self, formula_a, formula_b):
-    self.formula_a = formula_a
-    self.formula_b = formula_b
+  def __new__(cls, formula_a, formula_b):
+    return intern(cls, formula_a, formula_b)
 
   def freeVariables(self):
     return self.formula_a.freeVariables() | \
@@ -281,26 +257,14 @@ class Or:
     return self.formula_a.occurs(unification_term) or \
       self.formula_b.occurs(unification_term)
 
-  def setInstantiationTime(self, time):
-    self.formula_a.setInstantiationTime(time)
-    self.formula_b.setInstantiationTime(time)
-
-  def __eq__(self, other):
-    if not isinstance(other, Or):
-      return False
-    return self.formula_a == other.formula_a and \
-      self.formula_b == other.formula_b
-
   def __str__(self):
     return '(%s ∨ %s)' % (self.formula_a, self.formula_b)
 
-  def __hash__(self):
-    return hash(str(self))
+class Implies(Node):
+  __slots__ = ('formula_a', 'formula_b')
 
-class Implies:
-  def __init__(self, formula_a, formula_b):
-    self.formula_a = formula_a
-    self.formula_b = formula_b
+  def __new__(cls, formula_a, formula_b):
+    return intern(cls, formula_a, formula_b)
 
   def freeVariables(self):
     return self.formula_a.freeVariables() | \
@@ -322,26 +286,14 @@ class Implies:
     return self.formula_a.occurs(unification_term) or \
       self.formula_b.occurs(unification_term)
 
-  def setInstantiationTime(self, time):
-    self.formula_a.setInstantiationTime(time)
-    self.formula_b.setInstantiationTime(time)
-
-  def __eq__(self, other):
-    if not isinstance(other, Implies):
-      return False
-    return self.formula_a == other.formula_a and \
-      self.formula_b == other.formula_b
-
   def __str__(self):
     return '(%s → %s)' % (self.formula_a, self.formula_b)
 
-  def __hash__(self):
-    return hash(str(self))
+class ForAll(Node):
+  __slots__ = ('variable', 'formula')
 
-class ForAll:
-  def __init__(self, variable, formula):
-    self.variable = variable
-    self.formula = formula
+  def __new__(cls, variable, formula):
+    return intern(cls, variable, formula)
 
   def freeVariables(self):
     return self.formula.freeVariables() - { self.variable }
@@ -360,26 +312,14 @@ class ForAll:
   def occurs(self, unification_term):
     return self.formula.occurs(unification_term)
 
-  def setInstantiationTime(self, time):
-    self.variable.setInstantiationTime(time)
-    self.formula.setInstantiationTime(time)
-
-  def __eq__(self, other):
-    if not isinstance(other, ForAll):
-      return False
-    return self.variable == other.variable and \
-      self.formula == other.formula
-
   def __str__(self):
     return '(∀%s. %s)' % (self.variable, self.formula)
 
-  def __hash__(self):
-    return hash(str(self))
+class ThereExists(Node):
+  __slots__ = ('variable', 'formula')
 
-class ThereExists:
-  def __init__(self, variable, formula):
-    self.variable = variable
-    self.formula = formula
+  def __new__(cls, variable, formula):
+    return intern(cls, variable, formula)
 
   def freeVariables(self):
     return self.formula.freeVariables() - { self.variable }
@@ -398,18 +338,5 @@ class ThereExists:
   def occurs(self, unification_term):
     return self.formula.occurs(unification_term)
 
-  def setInstantiationTime(self, time):
-    self.variable.setInstantiationTime(time)
-    self.formula.setInstantiationTime(time)
-
-  def __eq__(self, other):
-    if not isinstance(other, ThereExists):
-      return False
-    return self.variable == other.variable and \
-      self.formula == other.formula
-
   def __str__(self):
     return '(∃%s. %s)' % (self.variable, self.formula)
-
-  def __hash__(self):
-    return hash(str(self))
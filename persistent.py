@@ -0,0 +1,262 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+##############################################################################
+# Persistent maps
+##############################################################################
+
+# a hash array mapped trie: updating a map returns a new map which shares
+# all but O(log n) of its nodes with the old one, so maps can be "copied"
+# for free and nodes are never modified once built
+
+BITS = 5
+MASK = (1 << BITS) - 1
+HASH_BITS = 64
+
+def keyHash(key):
+  return hash(key) & ((1 << HASH_BITS) - 1)
+
+def popcount(bitmap):
+  return bin(bitmap).count('1')
+
+# build the smallest node holding two leaves whose hashes differ
+def mergeLeaves(shift, leaf_a, hash_a, leaf_b, hash_b):
+  if shift >= HASH_BITS or hash_a == hash_b:
+    return CollisionNode(hash_a, (leaf_a, leaf_b))
+  bit_a = 1 << ((hash_a >> shift) & MASK)
+  bit_b = 1 << ((hash_b >> shift) & MASK)
+  if bit_a == bit_b:
+    return BitmapNode(bit_a,
+      (mergeLeaves(shift + BITS, leaf_a, hash_a, leaf_b, hash_b),))
+  if bit_a < bit_b:
+    return BitmapNode(bit_a | bit_b, (leaf_a, leaf_b))
+  return BitmapNode(bit_a | bit_b, (leaf_b, leaf_a))
+
+# an interior node: entries are (key, value) leaves or child nodes, one for
+# each bit set in the bitmap
+class BitmapNode:
+  __slots__ = ('bitmap', 'entries')
+
+  def __init__(self, bitmap, entries):
+    self.bitmap = bitmap
+    self.entries = entries
+
+  def get(self, shift, key_hash, key, default):
+    bit = 1 << ((key_hash >> shift) & MASK)
+    if not self.bitmap & bit:
+      return default
+    entry = self.entries[popcount(self.bitmap & (bit - 1))]
+    if isinstance(entry, tuple):
+      if entry[0] == key:
+        return entry[1]
+      return default
+    return entry.get(shift + BITS, key_hash, key, default)
+
+  # returns the new node and whether the key was added
+  def set(self, shift, key_hash, key, value):
+    bit = 1 << ((key_hash >> shift) & MASK)
+    index = popcount(self.bitmap & (bit - 1))
+    entries = self.entries
+    if not self.bitmap & bit:
+      return BitmapNode(self.bitmap | bit,
+        entries[:index] + ((key, value),) + entries[index:]), True
+    entry = entries[index]
+    if isinstance(entry, tuple):
+      if entry[0] == key:
+        if entry[1] is value:
+          return self, False
+        node = (key, value)
+        added = False
+      else:
+        node = mergeLeaves(shift + BITS, entry, keyHash(entry[0]),
+          (key, value), key_hash)
+        added = True
+    else:
+      node, added = entry.set(shift + BITS, key_hash, key, value)
+      if node is entry:
+        return self, False
+    return BitmapNode(self.bitmap,
+      entries[:index] + (node,) + entries[index + 1:]), added
+
+  # returns the new node, or None if it is empty
+  def delete(self, shift, key_hash, key):
+    bit = 1 << ((key_hash >> shift) & MASK)
+    if not self.bitmap & bit:
+      raise KeyError(key)
+    index = popcount(self.bitmap & (bit - 1))
+    entries = self.entries
+    entry = entries[index]
+    if isinstance(entry, tuple):
+      if entry[0] != key:
+        raise KeyError(key)
+      node = None
+    else:
+      node = entry.delete(shift + BITS, key_hash, key)
+      # pull a lone leaf up so the trie stays as shallow as possible
+      if isinstance(node, BitmapNode) and len(node.entries) == 1 and \
+        isinstance(node.entries[0], tuple):
+        node = node.entries[0]
+    if node is None:
+      if len(entries) == 1:
+        return None
+      return BitmapNode(self.bitmap & ~bit,
+        entries[:index] + entries[index + 1:])
+    return BitmapNode(self.bitmap,
+      entries[:index] + (node,) + entries[index + 1:])
+
+  def items(self):
+    for entry in self.entries:
+      if isinstance(entry, tuple):
+        yield entry
+      else:
+        yield from entry.items()
+
+# a leaf bucket for keys whose full hashes are equal
+class CollisionNode:
+  __slots__ = ('key_hash', 'entries')
+
+  def __init__(self, key_hash, entries):
+    self.key_hash = key_hash
+    self.entries = entries
+
+  def get(self, shift, key_hash, key, default):
+    for entry in self.entries:
+      if entry[0] == key:
+        return entry[1]
+    return default
+
+  def set(self, shift, key_hash, key, value):
+    if key_hash != self.key_hash:
+      node = BitmapNode(1 << ((self.key_hash >> shift) & MASK), (self,))
+      return node.set(shift, key_hash, key, value)
+    for index, entry in enumerate(self.entries):
+      if entry[0] == key:
+        if entry[1] is value:
+          return self, False
+        return CollisionNode(self.key_hash, self.entries[:index] +
+          ((key, value),) + self.entries[index + 1:]), False
+    return CollisionNode(self.key_hash,
+      self.entries + ((key, value),)), True
+
+  def delete(self, shift, key_hash, key):
+    for index, entry in enumerate(self.entries):
+      if entry[0] == key:
+        entries = self.entries[:index] + self.entries[index + 1:]
+        if len(entries) == 0:
+          return None
+        if len(entries) == 1:
+          return BitmapNode(1 << ((self.key_hash >> shift) & MASK), entries)
+        return CollisionNode(self.key_hash, entries)
+    raise KeyError(key)
+
+  def items(self):
+    return iter(self.entries)
+
+EMPTY_NODE = BitmapNode(0, ())
+
+class PersistentMap:
+  __slots__ = ('root', 'length')
+
+  def __init__(self, items=(), root=EMPTY_NODE, length=0):
+    self.root = root
+    self.length = length
+    for key, value in items:
+      self.root, added = self.root.set(0, keyHash(key), key, value)
+      if added:
+        self.length += 1
+
+  def get(self, key, default=None):
+    return self.root.get(0, keyHash(key), key, default)
+
+  def set(self, key, value):
+    root, added = self.root.set(0, keyHash(key), key, value)
+    if root is self.root:
+      return self
+    return PersistentMap((), root, self.length + (1 if added else 0))
+
+  # the map without the key; a missing key raises KeyError, as del does on a
+  # dict, so that a caller which thinks the key is there finds out it is not
+  def delete(self, key):
+    root = self.root.delete(0, keyHash(key), key)
+    if root is None:
+      root = EMPTY_NODE
+    return PersistentMap((), root, self.length - 1)
+
+  def __getitem__(self, key):
+    value = self.root.get(0, keyHash(key), key, self)
+    if value is self:
+      raise KeyError(key)
+    return value
+
+  def __contains__(self, key):
+    return self.root.get(0, keyHash(key), key, self) is not self
+
+  def __len__(self):
+    return self.length
+
+  def __iter__(self):
+    for key, value in self.root.items():
+      yield key
+
+  def keys(self):
+    return iter(self)
+
+  def values(self):
+    for key, value in self.root.items():
+      yield value
+
+  def items(self):
+    return self.root.items()
+
+  # the layout of the trie follows the hashes of the keys, and those differ
+  # from one process to another (strings are hashed with a random seed), so
+  # a map is pickled as its items and built again where it is unpickled
+  def __reduce__(self):
+    return (PersistentMap, (list(self.items()),))
+
+##############################################################################
+# Persistent heaps
+##############################################################################
+
+# a leftist heap: nodes are (rank, item, left, right) tuples with the
+# shorter right spine, so merging, pushing and popping are O(log n) and
+# produce a new heap that shares nodes with the old one
+
+def rank(node):
+  if node is None:
+    return 0
+  return node[0]
+
+def mergeHeaps(node_a, node_b):
+  if node_a is None:
+    return node_b
+  if node_b is None:
+    return node_a
+  if node_b[1] < node_a[1]:
+    node_a, node_b = node_b, node_a
+  left = node_a[2]
+  right = mergeHeaps(node_a[3], node_b)
+  if rank(left) < rank(right):
+    left, right = right, left
+  return (rank(right) + 1, node_a[1], left, right)
+
+class PersistentHeap:
+  __slots__ = ('root',)
+
+  def __init__(self, root=None):
+    self.root = root
+
+  def push(self, item):
+    return PersistentHeap(mergeHeaps(self.root, (1, item, None, None)))
+
+  # the smallest item, or None if the heap is empty
+  def peek(self):
+    if self.root is None:
+      return None
+    return self.root[1]
+
+  def pop(self):
+    return PersistentHeap(mergeHeaps(self.root[2], self.root[3]))
+
+  def __bool__(self):
+    return self.root is not None
@@ -5,89 +5,355 @@
 # 2021 Kardi Teknomo
 
 from language import *
+from persistent import PersistentMap, PersistentHeap
+from sat import isPropositional, provePropositional
+from collections import deque
+from itertools import count
+from multiprocessing.connection import wait
+import multiprocessing
+import json
+import os
+import sys
+import time
+
+try:
+  import resource
+except ImportError:
+  resource = None
 
 ##############################################################################
 # Unification
 ##############################################################################
 
-# solve a single equation
-def unify(term_a, term_b):
-  if isinstance(term_a, UnificationTerm):
-    if term_b.occurs(term_a) or term_b.time > term_a.time:
-      return None
-    return { term_a: term_b }
-  if isinstance(term_b, UnificationTerm):
-    if term_a.occurs(term_b) or term_a.time > term_b.time:
-      return None
-    return { term_b: term_a }
-  if isinstance(term_a, Variable) and isinstance(term_b, Variable):
+# a substitution in triangular form: a unification term may be bound to a
+# term which contains other bound unification terms, so binding never
+# rebuilds a term and bindings are resolved on demand; the trail records the
+# order of the bindings so that they can be undone when backtracking
+class Substitution:
+  def __init__(self, times):
+    self.times = times
+    self.bindings = { }
+    self.trail = []
+
+  # follow the bindings of a unification term
+  def resolve(self, term):
+    while isinstance(term, UnificationTerm) and term in self.bindings:
+      term = self.bindings[term]
+    return term
+
+  # apply the substitution to a term
+  def apply(self, term):
+    term = self.resolve(term)
+    if isinstance(term, Function):
+      return Function(term.name, [self.apply(subterm)
+        for subterm in term.terms])
+    return term
+
+  def occurs(self, unification_term, term):
+    term = self.resolve(term)
+    if isinstance(term, Function):
+      return any([self.occurs(unification_term, subterm)
+        for subterm in term.terms])
+    return term == unification_term
+
+  def instantiationTime(self, term):
+    term = self.resolve(term)
+    if isinstance(term, Function):
+      return max([self.instantiationTime(subterm)
+        for subterm in term.terms], default=0)
+    return term.instantiationTime(self.times)
+
+  def bind(self, unification_term, term):
+    if self.occurs(unification_term, term) or self.instantiationTime(term) > \
+      unification_term.instantiationTime(self.times):
+      return False
+    self.bindings[unification_term] = term
+    self.trail.append(unification_term)
+    return True
+
+  def mark(self):
+    return len(self.trail)
+
+  # remove the bindings made since the mark
+  def undo(self, mark):
+    while len(self.trail) > mark:
+      del self.bindings[self.trail.pop()]
+
+  # extend the substitution to solve an equation; on failure the
+  # substitution is left as it was
+  def unify(self, term_a, term_b):
+    mark = self.mark()
+    if self.solve(term_a, term_b):
+      return True
+    self.undo(mark)
+    return False
+
+  def solve(self, term_a, term_b):
+    term_a = self.resolve(term_a)
+    term_b = self.resolve(term_b)
     if term_a == term_b:
-      return { }
-    return None
-  if (isinstance(term_a, Function) and isinstance(term_b, Function)) or \
-     (isinstance(term_a, Predicate) and isinstance(term_b, Predicate)):
-    if term_a.name != term_b.name:
-      return None
-    if len(term_a.terms) != len(term_b.terms):
-      return None
-    substitution = { }
-    for i in range(len(term_a.terms)):
-      a = term_a.terms[i]
-      b = term_b.terms[i]
-      for k, v in substitution.items():
-        a = a.replace(k, v)
-        b = b.replace(k, v)
-      sub = unify(a, b)
-      if sub == None:
-        return None
-      for k, v in sub.items():
-        substitution[k] = v
+      return True
+    if isinstance(term_a, UnificationTerm):
+      return self.bind(term_a, term_b)
+    if isinstance(term_b, UnificationTerm):
+      return self.bind(term_b, term_a)
+    if (isinstance(term_a, Function) and isinstance(term_b, Function)) or \
+       (isinstance(term_a, Predicate) and isinstance(term_b, Predicate)):
+      if term_a.name != term_b.name:
+        return False
+      if len(term_a.terms) != len(term_b.terms):
+        return False
+      for i in range(len(term_a.terms)):
+        if not self.solve(term_a.terms[i], term_b.terms[i]):
+          return False
+      return True
+    return False
+
+  # the bindings in the order they were made, each with the bindings made
+  # before it applied
+  def items(self):
+    earlier = Substitution(self.times)
+    result = []
+    for unification_term in self.trail:
+      term = self.bindings[unification_term]
+      result.append((unification_term, earlier.apply(term)))
+      earlier.bindings[unification_term] = term
+    return result
+
+# solve a single equation
+def unify(term_a, term_b, times):
+  substitution = Substitution(times)
+  if substitution.solve(term_a, term_b):
     return substitution
   return None
 
 # solve a list of equations
-def unify_list(pairs):
-  substitution = { }
+def unify_list(pairs, times):
+  substitution = Substitution(times)
   for term_a, term_b in pairs:
-    a = term_a
-    b = term_b
-    for k, v in substitution.items():
-      a = a.replace(k, v)
-      b = b.replace(k, v)
-    sub = unify(a, b)
-    if sub == None:
+    if not substitution.unify(term_a, term_b):
       return None
-    for k, v in sub.items():
-      substitution[k] = v
+  return substitution
+
+# solve one equation chosen from each of the lists, trying the choices in
+# order; the substitution is extended one list at a time and a partial
+# choice is abandoned as soon as one of its equations fails; the equations
+# tried and failed are counted in the statistics, if given
+# the choices can take exponential time, so if limits are given (with the
+# statistics and the monotonic time at which the search started) they are
+# checked every so many equations; once one is exceeded the statistics
+# record it and None is returned, as if there were no solution; None is
+# also returned once the equations tried reach the limit on a single group
+# of choices, which the statistics count as an abandoned closure
+def unify_choices(pair_lists, times, statistics=None, limits=None,
+  start=None):
+  # the lists with the fewest choices go first: a failure there costs the
+  # least to find, and it is found before the choices in the longer lists
+  # multiply the equations to retry
+  pair_lists = sorted(pair_lists, key=len)
+  substitution = Substitution(times)
+  choices = [0] * len(pair_lists)
+  marks = [0] * len(pair_lists)
+  tried = 0
+  pos = 0
+  while 0 <= pos < len(pair_lists):
+    if limits is not None and tried == limits.max_unifications:
+      if statistics is not None:
+        statistics.closures_abandoned += 1
+      return None
+    if choices[pos] == len(pair_lists[pos]):
+      # no choice left at this position, so revise the previous one
+      choices[pos] = 0
+      pos -= 1
+      if pos >= 0:
+        substitution.undo(marks[pos])
+      continue
+    marks[pos] = substitution.mark()
+    term_a, term_b = pair_lists[pos][choices[pos]]
+    choices[pos] += 1
+    tried += 1
+    if substitution.unify(term_a, term_b):
+      pos += 1
+    elif statistics is not None:
+      statistics.unification_failures += 1
+    if statistics is not None:
+      statistics.unifications += 1
+      if limits is not None and statistics.unifications % \
+        ResourceLimits.unification_interval == 0:
+        statistics.seconds = time.monotonic() - start
+        statistics.exhausted = limits.exceeded(statistics)
+        if statistics.exhausted is not None:
+          return None
+  if pos < 0:
+    return None
   return substitution
 
 ##############################################################################
 # Sequents
 ##############################################################################
 
+# maps each formula on one side of a sequent to its depth, and keeps the sum
+# of the formula hashes up to date so that sequents hash in constant time;
+# the formulae are held in a persistent map, so copying is O(1) and each
+# update only copies O(log n) trie nodes; the formulae which can still be
+# expanded (everything but predicates) are also kept in a persistent heap
+# ordered by depth, so the next formula to expand is found in O(log n), and
+# the predicates are indexed by name and arity
+class FormulaMap:
+  # formulae are iterated in the order they were first inserted, as a dict;
+  # putting them in that order takes a sort, which is done again after each
+  # insertion or removal, so the search itself walks self.formulae (or the
+  # index) instead and only printing iterates the map
+  insertion_order = count()
+
+  def __init__(self, formulae={}):
+    self.formulae = PersistentMap()
+    self.hash = 0
+    self.ordered = []
+    self.expandable = PersistentHeap()
+    self.predicates = PersistentMap()
+    for formula, depth in formulae.items():
+      self[formula] = depth
+
+  def __getitem__(self, formula):
+    return self.formulae[formula][0]
+
+  def __setitem__(self, formula, depth):
+    entry = self.formulae.get(formula)
+    if entry is None:
+      self.hash += hash(formula)
+      entry = (depth, next(FormulaMap.insertion_order))
+      if isinstance(formula, Predicate):
+        # each index bucket is a linked list of (order, predicate, rest)
+        key = (formula.name, len(formula.terms))
+        self.predicates = self.predicates.set(key,
+          (entry[1], formula, self.predicates.get(key)))
+      self.ordered = None
+    elif entry[0] == depth:
+      return
+    self.formulae = self.formulae.set(formula, (depth, entry[1]))
+    if not isinstance(formula, Predicate):
+      self.expandable = self.expandable.push((depth, entry[1], formula))
+
+  def __delitem__(self, formula):
+    self.formulae = self.formulae.delete(formula)
+    self.hash -= hash(formula)
+    self.ordered = None
+
+  def __contains__(self, formula):
+    return formula in self.formulae
+
+  def __iter__(self):
+    return iter(self.keys())
+
+  def __len__(self):
+    return len(self.formulae)
+
+  def keys(self):
+    if self.ordered is None:
+      self.ordered = [formula for formula, entry in
+        sorted(self.formulae.items(), key=lambda item: item[1][1])]
+    return self.ordered
+
+  def items(self):
+    return [(formula, self.formulae[formula][0]) for formula in self.keys()]
+
+  # the expandable formula of least depth (the earliest inserted one in case
+  # of a tie) and its depth, or (None, None); entries for formulae which
+  # were removed or whose depth changed are dropped from the heap lazily
+  def minimum(self):
+    while self.expandable:
+      depth, order, formula = self.expandable.peek()
+      if self.formulae.get(formula) == (depth, order):
+        return formula, depth
+      self.expandable = self.expandable.pop()
+    return None, None
+
+  # the predicates with the given name and arity, in insertion order
+  def getPredicates(self, name, arity):
+    result = []
+    node = self.predicates.get((name, arity))
+    while node is not None:
+      order, predicate, node = node
+      entry = self.formulae.get(predicate)
+      if entry is not None and entry[1] == order:
+        result.append(predicate)
+    result.reverse()
+    return result
+
+  # the formula in both maps which was inserted into this one first, or
+  # None; only the smaller map is walked
+  def firstShared(self, other):
+    smaller, larger = self.formulae, other.formulae
+    if len(larger) < len(smaller):
+      smaller, larger = larger, smaller
+    result = None
+    for formula in smaller:
+      if formula in larger:
+        order = self.formulae[formula][1]
+        if result is None or order < result[0]:
+          result = (order, formula)
+    if result is None:
+      return None
+    return result[1]
+
+  def sameFormulae(self, other):
+    if self.hash != other.hash or len(self) != len(other):
+      return False
+    return all([formula in other.formulae for formula in self.formulae])
+
+  # a map unpickled in another process keeps its insertion orders, so the
+  # orders handed out there must start after them; the formula hashes differ
+  # there, so their sum is taken again (the maps rebuild their own tries)
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self.hash = sum([hash(formula) for formula in self.formulae])
+    last = max([entry[1] for formula, entry in self.formulae.items()],
+      default=-1)
+    FormulaMap.insertion_order = count(max(last + 1,
+      next(FormulaMap.insertion_order)))
+
+  def copy(self):
+    result = FormulaMap()
+    result.formulae = self.formulae
+    result.hash = self.hash
+    result.ordered = self.ordered
+    result.expandable = self.expandable
+    result.predicates = self.predicates
+    return result
+
+# times maps each variable and unification term introduced by the proof
+# search to the depth at which it was introduced (0 for input terms)
 class Sequent:
-  def __init__(self, left, right, siblings, depth):
+  def __init__(self, left, right, siblings, depth, times):
     self.left = left
     self.right = right
     self.siblings = siblings
     self.depth = depth
+    self.times = times
+    self.pairs = None
 
   def freeVariables(self):
     result = set()
-    for formula in self.left:
+    for formula in self.left.formulae:
       result |= formula.freeVariables()
-    for formula in self.right:
+    for formula in self.right.formulae:
       result |= formula.freeVariables()
     return result
 
   def freeUnificationTerms(self):
     result = set()
-    for formula in self.left:
+    for formula in self.left.formulae:
       result |= formula.freeUnificationTerms()
-    for formula in self.right:
+    for formula in self.right.formulae:
       result |= formula.freeUnificationTerms()
     return result
 
+  # the number of unification terms introduced on the way to this sequent
+  def instantiations(self):
+    return len([term for term in self.times
+      if isinstance(term, UnificationTerm)])
+
   def getVariableName(self, prefix):
     fv = self.freeVariables() | self.freeUnificationTerms()
     index = 1
@@ -97,28 +363,41 @@ class Sequent:
       name = prefix + str(index)
     return name
 
-  def getUnifiablePairs(self):
-    pairs = []
-    for formula_left in self.left:
-      for formula_right in self.right:
-        if unify(formula_left, formula_right) is not None:
-          pairs.append((formula_left, formula_right))
-    return pairs
+  # only predicates can unify, so the predicates on the left are paired with
+  # those on the right of the same name and arity, found through the smaller
+  # of the two indices; the pairs are put in the order of the formulae on
+  # the left (then on the right); a sequent is not modified once it is
+  # queued, so the pairs are only computed once; the equations tried and
+  # failed are counted in the statistics, if given
+  def getUnifiablePairs(self, statistics=None):
+    if self.pairs is None:
+      keys = self.left.predicates
+      if len(self.right.predicates) < len(keys):
+        keys = self.right.predicates
+      pairs = []
+      substitution = Substitution(self.times)
+      for name, arity in keys:
+        formulae_right = self.right.getPredicates(name, arity)
+        if len(formulae_right) == 0:
+          continue
+        for formula_left in self.left.getPredicates(name, arity):
+          order = self.left.formulae[formula_left][1]
+          for formula_right in formulae_right:
+            if substitution.unify(formula_left, formula_right):
+              pairs.append((order, formula_left, formula_right))
+              substitution.undo(0)
+            elif statistics is not None:
+              statistics.unification_failures += 1
+          if statistics is not None:
+            statistics.unifications += len(formulae_right)
+      pairs.sort(key=lambda pair: pair[0])
+      self.pairs = [(formula_left, formula_right)
+        for order, formula_left, formula_right in pairs]
+    return self.pairs
 
   def __eq__(self, other):
-    for formula in self.left:
-      if formula not in other.left:
-        return False
-    for formula in other.left:
-      if formula not in self.left:
-        return False
-    for formula in self.right:
-      if formula not in other.right:
-        return False
-    for formula in other.right:
-      if formula not in self.right:
-        return False
-    return True
+    return self.left.sameFormulae(other.left) and \
+      self.right.sameFormulae(other.right)
 
   def __str__(self):
     left_part = ', '.join([str(formula) for formula in self.left])
@@ -130,357 +409,1217 @@ class Sequent:
     return left_part + '⊢' + right_part
 
   def __hash__(self):
-    return hash(str(self))
+    return hash((self.left.hash, self.right.hash))
+
+##############################################################################
+# Resource limits
+##############################################################################
+
+# peak resident memory of this process in bytes, or None if unknown
+def peakMemory():
+  if resource is None:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  if sys.platform == 'darwin':
+    return peak
+  return peak * 1024
+
+# resident memory of this process in bytes right now, or None if it cannot
+# be read (there is no /proc, e.g. on macOS)
+def residentMemory():
+  try:
+    with open('/proc/self/statm') as statm:
+      return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+  except (OSError, ValueError, IndexError, AttributeError):
+    return None
+
+# how far a proof search got, and where the sequent search spent its effort:
+# rules counts the applications of each rule (e.g. 'ForAll-left', whose
+# every application is an instantiation), axioms the sequents closed by a
+# formula on both sides, closure_attempts and closures the sets of siblings
+# tried for a simultaneous unifier and closed by one, closures_abandoned
+# those given up at the limit on equations per group, unifications and
+# unification_failures the equations tried for them and to find the pairs
+# of predicates which unify in each sibling, phases the seconds
+# spent checking for axioms, unifying siblings, expanding and logging,
+# strategy the strategy which gave the answer when a portfolio was run, and
+# engine the prover which answered proveFormula ('sequent', 'resolution',
+# 'sat' for the SAT solver or 'cache')
+class SearchStatistics:
+  phase_names = ['axioms', 'unification', 'expansion', 'logging']
+
+  def __init__(self):
+    self.sequents = 0
+    self.depth = 0
+    self.frontier = 0
+    self.proven = 0
+    self.seconds = 0.0
+    self.exhausted = None
+    self.rules = {}
+    self.axioms = 0
+    self.closure_attempts = 0
+    self.closures = 0
+    self.closures_abandoned = 0
+    self.unifications = 0
+    self.unification_failures = 0
+    self.phases = { phase: 0.0 for phase in SearchStatistics.phase_names }
+    self.strategy = None
+    self.engine = None
+
+  def count(self, side, formula):
+    rule = '%s-%s' % (type(formula).__name__, side)
+    self.rules[rule] = self.rules.get(rule, 0) + 1
+
+  # add in the statistics of a search of an independent branch
+  def merge(self, other):
+    self.sequents += other.sequents
+    self.depth = max(self.depth, other.depth)
+    self.frontier = max(self.frontier, other.frontier)
+    self.proven += other.proven
+    for rule, applications in other.rules.items():
+      self.rules[rule] = self.rules.get(rule, 0) + applications
+    self.axioms += other.axioms
+    self.closure_attempts += other.closure_attempts
+    self.closures += other.closures
+    self.closures_abandoned += other.closures_abandoned
+    self.unifications += other.unifications
+    self.unification_failures += other.unification_failures
+    for phase, seconds in other.phases.items():
+      self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+  def toDict(self):
+    values = dict(self.__dict__)
+    values['rules'] = dict(self.rules)
+    values['phases'] = dict(self.phases)
+    if self.strategy is not None:
+      values['strategy'] = str(self.strategy)
+    return values
+
+  def __str__(self):
+    return '%d sequents expanded, depth %d, frontier %d, ' \
+      '%d proven, %.3f seconds' % (self.sequents, self.depth, self.frontier,
+      self.proven, self.seconds)
+
+# bounds on a proof search; a limit of None is unbounded, and max_memory
+# bounds the resident memory of the process in bytes; where that cannot be
+# read only the peak is known, which never goes down, so there the limit
+# only suits a process which runs a single search; max_unifications bounds
+# the equations tried for each group of siblings, so that one group cannot
+# stall the search (the search goes on, but cannot show that the sequent is
+# not provable any more)
+class ResourceLimits:
+  # the memory use is only sampled every so many sequents
+  memory_interval = 64
+
+  # the search for a unifier of a group of siblings checks the limits every
+  # so many equations
+  unification_interval = 4096
+
+  def __init__(self, timeout=None, max_sequents=None, max_depth=None,
+    max_frontier=None, max_memory=None, max_unifications=10000):
+    self.timeout = timeout
+    self.max_sequents = max_sequents
+    self.max_depth = max_depth
+    self.max_frontier = max_frontier
+    self.max_memory = max_memory
+    self.max_unifications = max_unifications
+
+  # returns a description of the first limit exceeded, or None
+  def exceeded(self, statistics):
+    if self.timeout is not None and statistics.seconds > self.timeout:
+      return 'time limit of %s seconds reached' % self.timeout
+    if self.max_sequents is not None and \
+      statistics.sequents > self.max_sequents:
+      return 'limit of %s sequents reached' % self.max_sequents
+    if self.max_depth is not None and statistics.depth > self.max_depth:
+      return 'depth limit of %s reached' % self.max_depth
+    if self.max_frontier is not None and \
+      statistics.frontier > self.max_frontier:
+      return 'frontier limit of %s sequents reached' % self.max_frontier
+    if self.max_memory is not None and \
+      statistics.sequents % ResourceLimits.memory_interval == 0:
+      memory = residentMemory()
+      if memory is None:
+        memory = peakMemory()
+      if memory is not None and memory > self.max_memory:
+        return 'memory limit of %s bytes reached' % self.max_memory
+    return None
+
+##############################################################################
+# Strategies
+##############################################################################
+
+# a configuration of the proof search: prefer_left expands the formula on the
+# left when both sides have one of least depth (by default the right one is
+# expanded), max_instantiations bounds the number of unification terms on
+# each branch, and deepening is a list of increasing depth bounds under which
+# the search is run before it is run without one; the search is breadth-first,
+# so a bound never finds a proof sooner, it only stops the search sooner
+class Strategy:
+  def __init__(self, prefer_left=False, max_instantiations=None,
+    deepening=None):
+    self.prefer_left = prefer_left
+    self.max_instantiations = max_instantiations
+    self.deepening = deepening
+
+  def __str__(self):
+    options = []
+    if self.prefer_left:
+      options.append('prefer left')
+    if self.max_instantiations is not None:
+      options.append('at most %s instantiations' % self.max_instantiations)
+    if self.deepening is not None:
+      options.append('deepening %s' % ', '.join(
+        [str(bound) for bound in self.deepening]))
+    if len(options) == 0:
+      return 'default'
+    return ', '.join(options)
+
+# the strategies a portfolio runs by default
+PORTFOLIO = [
+  Strategy(),
+  Strategy(prefer_left=True),
+  Strategy(max_instantiations=4),
+]
+
+##############################################################################
+# Proof logs
+##############################################################################
+
+# a proof log receives every sequent the search expands and every
+# substitution which closes a group of siblings; the entries are only
+# formatted when the log is read (or, for the echoing and streaming logs,
+# written), and iterating over a log yields the formatted lines
+# the search also reports the rule applied to each sequent and how each
+# sequent was closed; only ProofTree keeps those
+
+def formatEntry(entry):
+  if isinstance(entry, Sequent):
+    return '%s. %s' % (entry.depth, entry)
+  return '  %s = %s' % entry
+
+# discards everything
+class NullLog:
+  # whether the log keeps, passes on or counts what the search does; a
+  # query which the SAT solver could decide is still searched for such a
+  # log, since the solver does nothing it could show
+  records = False
+
+  def sequent(self, sequent):
+    pass
+
+  def substitution(self, term, value):
+    pass
+
+  # side is 'left' or 'right' and premises are the new sequents
+  def expanded(self, sequent, side, formula, premises):
+    pass
+
+  def axiom(self, sequent, formula):
+    pass
+
+  def unified(self, sequents, bindings):
+    pass
+
+  def __iter__(self):
+    return iter([])
+
+# keeps every entry, optionally printing each line as it arrives
+class ProofLog(NullLog):
+  records = True
+
+  def __init__(self, echo=True):
+    self.echo = echo
+    self.entries = []
+
+  def sequent(self, sequent):
+    self.entries.append(sequent)
+    if self.echo:
+      print(formatEntry(sequent))
+
+  def substitution(self, term, value):
+    self.entries.append((term, value))
+    if self.echo:
+      print(formatEntry((term, value)))
+
+  def __iter__(self):
+    return (formatEntry(entry) for entry in self.entries)
+
+  def __len__(self):
+    return len(self.entries)
+
+# only counts the entries
+class CountingLog(NullLog):
+  records = True
+
+  def __init__(self):
+    self.sequents = 0
+    self.substitutions = 0
+
+  def sequent(self, sequent):
+    self.sequents += 1
+
+  def substitution(self, term, value):
+    self.substitutions += 1
+
+# keeps the most recent entries
+class RingLog(ProofLog):
+  def __init__(self, size):
+    ProofLog.__init__(self, False)
+    self.entries = deque(maxlen=size)
+
+# writes each line to a file-like object as it arrives
+class StreamLog(NullLog):
+  records = True
+
+  def __init__(self, stream):
+    self.stream = stream
+
+  def sequent(self, sequent):
+    self.stream.write(formatEntry(sequent) + '\n')
+
+  def substitution(self, term, value):
+    self.stream.write(formatEntry((term, value)) + '\n')
+
+# hands each line to a function as it arrives
+class CallbackLog(NullLog):
+  records = True
+
+  def __init__(self, callback):
+    self.callback = callback
+
+  def sequent(self, sequent):
+    self.callback(formatEntry(sequent))
+
+  def substitution(self, term, value):
+    self.callback(formatEntry((term, value)))
+
+# keeps every call made to it, so that a search which may be thrown away can
+# be logged here and the calls made again on the real log if it is kept
+class DeferredLog(NullLog):
+  records = True
+
+  def __init__(self):
+    self.calls = []
+
+  def sequent(self, sequent):
+    self.calls.append(('sequent', (sequent,)))
+
+  def substitution(self, term, value):
+    self.calls.append(('substitution', (term, value)))
+
+  def expanded(self, sequent, side, formula, premises):
+    self.calls.append(('expanded', (sequent, side, formula, premises)))
+
+  def axiom(self, sequent, formula):
+    self.calls.append(('axiom', (sequent, formula)))
+
+  def unified(self, sequents, bindings):
+    self.calls.append(('unified', (sequents, bindings)))
+
+  def replay(self, log):
+    for name, arguments in self.calls:
+      getattr(log, name)(*arguments)
+
+##############################################################################
+# Proof trees
+##############################################################################
+
+# the sequents of a proof search linked by the rules applied to them; a
+# node whose rule is None was never closed or expanded
+
+LATEX_SYMBOLS = [
+  ('_', '\\_'),
+  ('⊢', '\\vdash'),
+  ('¬', '\\neg '),
+  ('∧', '\\land'),
+  ('∨', '\\lor'),
+  ('→', '\\rightarrow'),
+  ('∀', '\\forall '),
+  ('∃', '\\exists '),
+]
+
+LATEX_RULES = {
+  'Not': '\\neg',
+  'And': '\\land',
+  'Or': '\\lor',
+  'Implies': '\\rightarrow',
+  'ForAll': '\\forall',
+  'ThereExists': '\\exists',
+}
+
+def latexString(value):
+  result = str(value)
+  for symbol, replacement in LATEX_SYMBOLS:
+    result = result.replace(symbol, replacement)
+  return result
+
+class ProofNode:
+  __slots__ = ('sequent', 'parent', 'rule', 'formula', 'premises', 'unifier')
+
+  def __init__(self, sequent, parent):
+    self.sequent = sequent
+    self.parent = parent
+    self.rule = None
+    self.formula = None
+    self.premises = ()
+    self.unifier = None
+
+  def label(self):
+    if self.rule is None:
+      return 'open'
+    if self.rule == 'unify':
+      return 'unify: ' + ', '.join(['%s = %s' % (term, value)
+        for term, value in self.unifier])
+    return '%s: %s' % (self.rule, self.formula)
+
+  def toText(self, indent=0):
+    lines = ['%s%s. %s  [%s]' % ('  ' * indent, self.sequent.depth,
+      self.sequent, self.label())]
+    for premise in self.premises:
+      lines.append(premise.toText(indent + 1))
+    return '\n'.join(lines)
+
+  # bussproofs commands, premises first
+  def toLatex(self):
+    if self.rule is None:
+      return '\\AxiomC{$%s$}' % latexString(self.sequent)
+    lines = []
+    for premise in self.premises:
+      lines.append(premise.toLatex())
+    if self.rule == 'axiom':
+      lines.append('\\AxiomC{}')
+      lines.append('\\RightLabel{\\scriptsize Ax}')
+    elif self.rule == 'unify':
+      lines.append('\\AxiomC{}')
+      lines.append('\\RightLabel{\\scriptsize $%s$}' % ', '.join([
+        '%s \\mapsto %s' % (latexString(term), latexString(value))
+        for term, value in self.unifier]))
+    else:
+      name, side = self.rule.split('-')
+      lines.append('\\RightLabel{\\scriptsize $%s$%s}' %
+        (LATEX_RULES[name], side[0].upper()))
+    if len(self.premises) == 2:
+      inference = '\\BinaryInfC'
+    else:
+      inference = '\\UnaryInfC'
+    lines.append('%s{$%s$}' % (inference, latexString(self.sequent)))
+    return '\n'.join(lines)
+
+  def toDict(self):
+    result = {
+      'sequent': str(self.sequent),
+      'depth': self.sequent.depth,
+      'rule': self.rule,
+    }
+    if self.formula is not None:
+      result['formula'] = str(self.formula)
+    if self.unifier is not None:
+      result['unifier'] = [[str(term), str(value)]
+        for term, value in self.unifier]
+    if len(self.premises) > 0:
+      result['premises'] = [premise.toDict() for premise in self.premises]
+    return result
+
+# a proof log which links the sequents into a tree rooted at the first one;
+# it only holds references to the sequents, so nothing is formatted until
+# the tree is rendered
+class ProofTree(ProofLog):
+  def __init__(self, echo=False):
+    ProofLog.__init__(self, echo)
+    self.nodes = {}
+    self.root = None
+
+  # sequents compare by their formulae, so nodes are found by identity
+  def node(self, sequent, parent=None):
+    node = self.nodes.get(id(sequent))
+    if node is None:
+      node = ProofNode(sequent, parent)
+      self.nodes[id(sequent)] = node
+      if self.root is None:
+        self.root = node
+    return node
+
+  def sequent(self, sequent):
+    ProofLog.sequent(self, sequent)
+    self.node(sequent)
+
+  def expanded(self, sequent, side, formula, premises):
+    node = self.node(sequent)
+    node.rule = '%s-%s' % (type(formula).__name__, side)
+    node.formula = formula
+    node.premises = tuple([self.node(premise, node) for premise in premises])
+
+  def axiom(self, sequent, formula):
+    node = self.node(sequent)
+    node.rule = 'axiom'
+    node.formula = formula
+    node.premises = ()
+
+  # every sibling is closed by the substitution, including ones which were
+  # expanded already; their premises are not needed any more
+  def unified(self, sequents, bindings):
+    bindings = tuple(bindings)
+    for sequent in sequents:
+      node = self.node(sequent)
+      node.rule = 'unify'
+      node.formula = None
+      node.premises = ()
+      node.unifier = bindings
+
+  def render(self, format='text'):
+    if self.root is None:
+      return ''
+    if format == 'text':
+      return self.root.toText()
+    if format == 'latex':
+      return '\\begin{prooftree}\n%s\n\\end{prooftree}' % \
+        self.root.toLatex()
+    if format == 'json':
+      return json.dumps(self.root.toDict(), ensure_ascii=False)
+    raise ValueError('Unknown proof format: %s.' % format)
 
 ##############################################################################
 # Proof search
 ##############################################################################
 
+# applies a rule to the expandable formula of least depth in the sequent and
+# appends the new sequents to the frontier; returns the side of the formula
+# ('left' or 'right') and the formula, or (None, None) if there is none
+# a quantifier which cannot be instantiated any more under the strategy is
+# dropped instead, and the side is 'weaken'
+def expandSequent(old_sequent, frontier, strategy):
+  # determine which formula to expand
+  left_formula, left_depth = old_sequent.left.minimum()
+  right_formula, right_depth = old_sequent.right.minimum()
+  apply_left = False
+  apply_right = False
+  if left_formula is not None and right_formula is None:
+    apply_left = True
+  if left_formula is None and right_formula is not None:
+    apply_right = True
+  if left_formula is not None and right_formula is not None:
+    if left_depth < right_depth or \
+      (strategy.prefer_left and left_depth == right_depth):
+      apply_left = True
+    else:
+      apply_right = True
+  if left_formula is None and right_formula is None:
+    return None, None
+
+  # weaken a quantifier once the branch has enough unification terms
+  if strategy.max_instantiations is not None and \
+    ((apply_left and isinstance(left_formula, ForAll)) or \
+    (apply_right and isinstance(right_formula, ThereExists))) and \
+    old_sequent.instantiations() >= strategy.max_instantiations:
+    new_sequent = Sequent(
+      old_sequent.left.copy(),
+      old_sequent.right.copy(),
+      old_sequent.siblings,
+      old_sequent.depth + 1,
+      old_sequent.times
+    )
+    if apply_left:
+      del new_sequent.left[left_formula]
+    else:
+      del new_sequent.right[right_formula]
+    if new_sequent.siblings is not None:
+      new_sequent.siblings.add(new_sequent)
+    frontier.append(new_sequent)
+    return 'weaken', left_formula if apply_left else right_formula
+
+  # apply a left rule
+  if apply_left:
+    if isinstance(left_formula, Not):
+      new_sequent = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      del new_sequent.left[left_formula]
+      new_sequent.right[left_formula.formula] = \
+      old_sequent.left[left_formula] + 1
+      if new_sequent.siblings is not None:
+        new_sequent.siblings.add(new_sequent)
+      frontier.append(new_sequent)
+      return 'left', left_formula
+    if isinstance(left_formula, And):
+      new_sequent = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      del new_sequent.left[left_formula]
+      new_sequent.left[left_formula.formula_a] = \
+        old_sequent.left[left_formula] + 1
+      new_sequent.left[left_formula.formula_b] = \
+      old_sequent.left[left_formula] + 1
+      if new_sequent.siblings is not None:
+        new_sequent.siblings.add(new_sequent)
+      frontier.append(new_sequent)
+      return 'left', left_formula
+    if isinstance(left_formula, Or):
+      new_sequent_a = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      new_sequent_b = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      del new_sequent_a.left[left_formula]
+      del new_sequent_b.left[left_formula]
+      new_sequent_a.left[left_formula.formula_a] = \
+        old_sequent.left[left_formula] + 1
+      new_sequent_b.left[left_formula.formula_b] = \
+      old_sequent.left[left_formula] + 1
+      if new_sequent_a.siblings is not None:
+        new_sequent_a.siblings.add(new_sequent_a)
+      frontier.append(new_sequent_a)
+      if new_sequent_b.siblings is not None:
+        new_sequent_b.siblings.add(new_sequent_b)
+      frontier.append(new_sequent_b)
+      return 'left', left_formula
+    if isinstance(left_formula, Implies):
+      new_sequent_a = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      new_sequent_b = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      del new_sequent_a.left[left_formula]
+      del new_sequent_b.left[left_formula]
+      new_sequent_a.right[left_formula.formula_a] = \
+        old_sequent.left[left_formula] + 1
+      new_sequent_b.left[left_formula.formula_b] = \
+      old_sequent.left[left_formula] + 1
+      if new_sequent_a.siblings is not None:
+        new_sequent_a.siblings.add(new_sequent_a)
+      frontier.append(new_sequent_a)
+      if new_sequent_b.siblings is not None:
+        new_sequent_b.siblings.add(new_sequent_b)
+      frontier.append(new_sequent_b)
+      return 'left', left_formula
+    if isinstance(left_formula, ForAll):
+      new_sequent = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings or set(),
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      new_sequent.left[left_formula] += 1
+      term = UnificationTerm(old_sequent.getVariableName('t'))
+      new_sequent.times = old_sequent.times.copy()
+      new_sequent.times[term] = old_sequent.depth + 1
+      formula = left_formula.formula.replace(left_formula.variable, term)
+      if formula not in new_sequent.left:
+        new_sequent.left[formula] = new_sequent.left[left_formula]
+      if new_sequent.siblings is not None:
+        new_sequent.siblings.add(new_sequent)
+      frontier.append(new_sequent)
+      return 'left', left_formula
+    if isinstance(left_formula, ThereExists):
+      new_sequent = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      del new_sequent.left[left_formula]
+      variable = Variable(old_sequent.getVariableName('v'))
+      new_sequent.times = old_sequent.times.copy()
+      new_sequent.times[variable] = old_sequent.depth + 1
+      formula = left_formula.formula.replace(left_formula.variable,
+        variable)
+      new_sequent.left[formula] = old_sequent.left[left_formula] + 1
+      if new_sequent.siblings is not None:
+        new_sequent.siblings.add(new_sequent)
+      frontier.append(new_sequent)
+      return 'left', left_formula
+
+  # apply a right rule
+  if apply_right:
+    if isinstance(right_formula, Not):
+      new_sequent = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      del new_sequent.right[right_formula]
+      new_sequent.left[right_formula.formula] = \
+      old_sequent.right[right_formula] + 1
+      if new_sequent.siblings is not None:
+        new_sequent.siblings.add(new_sequent)
+      frontier.append(new_sequent)
+      return 'right', right_formula
+    if isinstance(right_formula, And):
+      new_sequent_a = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      new_sequent_b = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      del new_sequent_a.right[right_formula]
+      del new_sequent_b.right[right_formula]
+      new_sequent_a.right[right_formula.formula_a] = \
+        old_sequent.right[right_formula] + 1
+      new_sequent_b.right[right_formula.formula_b] = \
+      old_sequent.right[right_formula] + 1
+      if new_sequent_a.siblings is not None:
+        new_sequent_a.siblings.add(new_sequent_a)
+      frontier.append(new_sequent_a)
+      if new_sequent_b.siblings is not None:
+        new_sequent_b.siblings.add(new_sequent_b)
+      frontier.append(new_sequent_b)
+      return 'right', right_formula
+    if isinstance(right_formula, Or):
+      new_sequent = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      del new_sequent.right[right_formula]
+      new_sequent.right[right_formula.formula_a] = \
+        old_sequent.right[right_formula] + 1
+      new_sequent.right[right_formula.formula_b] = \
+        old_sequent.right[right_formula] + 1
+      if new_sequent.siblings is not None:
+        new_sequent.siblings.add(new_sequent)
+      frontier.append(new_sequent)
+      return 'right', right_formula
+    if isinstance(right_formula, Implies):
+      new_sequent = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      del new_sequent.right[right_formula]
+      new_sequent.left[right_formula.formula_a] = \
+        old_sequent.right[right_formula] + 1
+      new_sequent.right[right_formula.formula_b] = \
+        old_sequent.right[right_formula] + 1
+      if new_sequent.siblings is not None:
+        new_sequent.siblings.add(new_sequent)
+      frontier.append(new_sequent)
+      return 'right', right_formula
+    if isinstance(right_formula, ForAll):
+      new_sequent = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings,
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      del new_sequent.right[right_formula]
+      variable = Variable(old_sequent.getVariableName('v'))
+      new_sequent.times = old_sequent.times.copy()
+      new_sequent.times[variable] = old_sequent.depth + 1
+      formula = right_formula.formula.replace(right_formula.variable,
+        variable)
+      new_sequent.right[formula] = old_sequent.right[right_formula] + 1
+      if new_sequent.siblings is not None:
+        new_sequent.siblings.add(new_sequent)
+      frontier.append(new_sequent)
+      return 'right', right_formula
+    if isinstance(right_formula, ThereExists):
+      new_sequent = Sequent(
+        old_sequent.left.copy(),
+        old_sequent.right.copy(),
+        old_sequent.siblings or set(),
+        old_sequent.depth + 1,
+        old_sequent.times
+      )
+      new_sequent.right[right_formula] += 1
+      term = UnificationTerm(old_sequent.getVariableName('t'))
+      new_sequent.times = old_sequent.times.copy()
+      new_sequent.times[term] = old_sequent.depth + 1
+      formula = right_formula.formula.replace(right_formula.variable, term)
+      if formula not in new_sequent.right:
+        new_sequent.right[formula] = new_sequent.right[right_formula]
+      if new_sequent.siblings is not None:
+        new_sequent.siblings.add(new_sequent)
+      frontier.append(new_sequent)
+      return 'right', right_formula
+
 # returns True if the sequent is provable
 # returns False or loops forever if the sequent is not provable
-def proveSequent(sequent):
-    
+# returns None if one of the limits is reached first; the statistics, if
+# given, are filled in with how far the search got
+# the search is recorded in the log, which is returned with the result; by
+# default every line is kept and printed
+# the strategy, if given, changes the order in which formulae are expanded
+# and bounds quantifier instantiation; a search which dropped a quantifier
+# because of it cannot show that the sequent is not provable
+def proveSequent(sequent, limits=None, statistics=None, log=None,
+  strategy=None):
+
   #initialize output
-  output=[]
-  
-  # reset the time for each formula in the sequent
-  for formula in sequent.left:
-    formula.setInstantiationTime(0)
-  for formula in sequent.right:
-    formula.setInstantiationTime(0)
+  if log is None:
+    log = ProofLog()
 
-  # sequents to be proven
-  frontier = [sequent]
+  if limits is None:
+    limits = ResourceLimits()
+  if statistics is None:
+    statistics = SearchStatistics()
+  if strategy is None:
+    strategy = Strategy()
+  start = time.monotonic()
+  phases = statistics.phases
+  
+  # sequents to be proven, in order of increasing depth
+  frontier = deque([sequent])
 
   # sequents which have been proven
-  proven = { sequent }
+  proven = set()
+
+  # whether a quantifier was dropped
+  weakened = False
+
+  # the closures abandoned before this search, which may share statistics
+  abandoned = statistics.closures_abandoned
 
   while True:
-    # get the next sequent
+    # get the next sequent, skipping the ones proven since they were queued
     old_sequent = None
     while len(frontier) > 0 and (old_sequent is None or old_sequent in proven):
-      old_sequent = frontier.pop(0)
-    if old_sequent is None:
+      old_sequent = frontier.popleft()
+    if old_sequent is None or old_sequent in proven:
       break
-    output.append('%s. %s' % (old_sequent.depth, old_sequent))
-    print('%s. %s' % (old_sequent.depth, old_sequent))
+
+    # stop if the search has run out of resources
+    statistics.sequents += 1
+    statistics.depth = max(statistics.depth, old_sequent.depth)
+    statistics.frontier = max(statistics.frontier, len(frontier) + 1)
+    statistics.proven = len(proven)
+    statistics.seconds = time.monotonic() - start
+    statistics.exhausted = limits.exceeded(statistics)
+    if statistics.exhausted is not None:
+      return None,log
+
+    mark = time.perf_counter()
+    log.sequent(old_sequent)
+    phases['logging'] += time.perf_counter() - mark
 
     # check if this sequent is axiomatically true without unification
-    if len(set(old_sequent.left.keys()) & set(old_sequent.right.keys())) > 0:
+    mark = time.perf_counter()
+    axiom = old_sequent.left.firstShared(old_sequent.right)
+    phases['axioms'] += time.perf_counter() - mark
+    if axiom is not None:
+      log.axiom(old_sequent, axiom)
+      statistics.axioms += 1
       proven.add(old_sequent)
       continue
 
     # check if this sequent has unification terms
     if old_sequent.siblings is not None:
+      mark = time.perf_counter()
+
       # get the unifiable pairs for each sibling
-      sibling_pair_lists = [sequent.getUnifiablePairs()
+      sibling_pair_lists = [sequent.getUnifiablePairs(statistics)
         for sequent in old_sequent.siblings]
 
       # check if there is a unifiable pair for each sibling
       if all([len(pair_list) > 0 for pair_list in sibling_pair_lists]):
-        # iterate through all simultaneous choices of pairs from each sibling
-        substitution = None
-        index = [0] * len(sibling_pair_lists)
-        while True:
-          # attempt to unify at the index
-          substitution = unify_list([sibling_pair_lists[i][index[i]]
-            for i in range(len(sibling_pair_lists))])
-          if substitution is not None:
-            break
-
-          # increment the index
-          pos = len(sibling_pair_lists) - 1
-          while pos >= 0:
-            index[pos] += 1
-            if index[pos] < len(sibling_pair_lists[pos]):
-              break
-            index[pos] = 0
-            pos -= 1
-          if pos < 0:
-            break
+        # merge the instantiation times of the siblings
+        times = { }
+        for sequent in old_sequent.siblings:
+          for term, term_time in sequent.times.items():
+            times[term] = max(times.get(term, 0), term_time)
+
+        # search for a simultaneous choice of pairs from each sibling
+        statistics.closure_attempts += 1
+        substitution = unify_choices(sibling_pair_lists, times, statistics,
+          limits, start)
+        phases['unification'] += time.perf_counter() - mark
+        if statistics.exhausted is not None:
+          statistics.proven = len(proven)
+          return None,log
         if substitution is not None:
-          for k, v in substitution.items():
-            print('  %s = %s' % (k, v))
-            output.append('  %s = %s' % (k, v))
+          statistics.closures += 1
+          bindings = substitution.items()
+          for k, v in bindings:
+            log.substitution(k, v)
+          log.unified(old_sequent.siblings, bindings)
           proven |= old_sequent.siblings
-          frontier = [sequent for sequent in frontier
-            if sequent not in old_sequent.siblings]
           continue
       else:
         # unlink this sequent
         old_sequent.siblings.remove(old_sequent)
+        phases['unification'] += time.perf_counter() - mark
 
-    while True:
-      # determine which formula to expand
-      left_formula = None
-      left_depth = None
-      for formula, depth in old_sequent.left.items():
-        if left_depth is None or left_depth > depth:
-          if not isinstance(formula, Predicate):
-            left_formula = formula
-            left_depth = depth
-      right_formula = None
-      right_depth = None
-      for formula, depth in old_sequent.right.items():
-        if right_depth is None or right_depth > depth:
-          if not isinstance(formula, Predicate):
-            right_formula = formula
-            right_depth = depth
-      apply_left = False
-      apply_right = False
-      if left_formula is not None and right_formula is None:
-        apply_left = True
-      if left_formula is None and right_formula is not None:
-        apply_right = True
-      if left_formula is not None and right_formula is not None:
-        if left_depth < right_depth:
-          apply_left = True
-        else:
-          apply_right = True
-      if left_formula is None and right_formula is None:
-        return False,output
-
-      # apply a left rule
-      if apply_left:
-        if isinstance(left_formula, Not):
-          new_sequent = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          del new_sequent.left[left_formula]
-          new_sequent.right[left_formula.formula] = \
-          old_sequent.left[left_formula] + 1
-          if new_sequent.siblings is not None:
-            new_sequent.siblings.add(new_sequent)
-          frontier.append(new_sequent)
-          break
-        if isinstance(left_formula, And):
-          new_sequent = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          del new_sequent.left[left_formula]
-          new_sequent.left[left_formula.formula_a] = \
-            old_sequent.left[left_formula] + 1
-          new_sequent.left[left_formula.formula_b] = \
-          old_sequent.left[left_formula] + 1
-          if new_sequent.siblings is not None:
-            new_sequent.siblings.add(new_sequent)
-          frontier.append(new_sequent)
-          break
-        if isinstance(left_formula, Or):
-          new_sequent_a = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          new_sequent_b = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          del new_sequent_a.left[left_formula]
-          del new_sequent_b.left[left_formula]
-          new_sequent_a.left[left_formula.formula_a] = \
-            old_sequent.left[left_formula] + 1
-          new_sequent_b.left[left_formula.formula_b] = \
-          old_sequent.left[left_formula] + 1
-          if new_sequent_a.siblings is not None:
-            new_sequent_a.siblings.add(new_sequent_a)
-          frontier.append(new_sequent_a)
-          if new_sequent_b.siblings is not None:
-            new_sequent_b.siblings.add(new_sequent_b)
-          frontier.append(new_sequent_b)
-          break
-        if isinstance(left_formula, Implies):
-          new_sequent_a = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          new_sequent_b = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          del new_sequent_a.left[left_formula]
-          del new_sequent_b.left[left_formula]
-          new_sequent_a.right[left_formula.formula_a] = \
-            old_sequent.left[left_formula] + 1
-          new_sequent_b.left[left_formula.formula_b] = \
-          old_sequent.left[left_formula] + 1
-          if new_sequent_a.siblings is not None:
-            new_sequent_a.siblings.add(new_sequent_a)
-          frontier.append(new_sequent_a)
-          if new_sequent_b.siblings is not None:
-            new_sequent_b.siblings.add(new_sequent_b)
-          frontier.append(new_sequent_b)
-          break
-        if isinstance(left_formula, ForAll):
-          new_sequent = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings or set(),
-            old_sequent.depth + 1
-          )
-          new_sequent.left[left_formula] += 1
-          formula = left_formula.formula.replace(
-            left_formula.variable,
-            UnificationTerm(old_sequent.getVariableName('t'))
-          )
-          formula.setInstantiationTime(old_sequent.depth + 1)
-          if formula not in new_sequent.left:
-            new_sequent.left[formula] = new_sequent.left[left_formula]
-          if new_sequent.siblings is not None:
-            new_sequent.siblings.add(new_sequent)
-          frontier.append(new_sequent)
-          break
-        if isinstance(left_formula, ThereExists):
-          new_sequent = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          del new_sequent.left[left_formula]
-          variable = Variable(old_sequent.getVariableName('v'))
-          formula = left_formula.formula.replace(left_formula.variable,
-            variable)
-          formula.setInstantiationTime(old_sequent.depth + 1)
-          new_sequent.left[formula] = old_sequent.left[left_formula] + 1
-          if new_sequent.siblings is not None:
-            new_sequent.siblings.add(new_sequent)
-          frontier.append(new_sequent)
-          break
-
-      # apply a right rule
-      if apply_right:
-        if isinstance(right_formula, Not):
-          new_sequent = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          del new_sequent.right[right_formula]
-          new_sequent.left[right_formula.formula] = \
-          old_sequent.right[right_formula] + 1
-          if new_sequent.siblings is not None:
-            new_sequent.siblings.add(new_sequent)
-          frontier.append(new_sequent)
-          break
-        if isinstance(right_formula, And):
-          new_sequent_a = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          new_sequent_b = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          del new_sequent_a.right[right_formula]
-          del new_sequent_b.right[right_formula]
-          new_sequent_a.right[right_formula.formula_a] = \
-            old_sequent.right[right_formula] + 1
-          new_sequent_b.right[right_formula.formula_b] = \
-          old_sequent.right[right_formula] + 1
-          if new_sequent_a.siblings is not None:
-            new_sequent_a.siblings.add(new_sequent_a)
-          frontier.append(new_sequent_a)
-          if new_sequent_b.siblings is not None:
-            new_sequent_b.siblings.add(new_sequent_b)
-          frontier.append(new_sequent_b)
-          break
-        if isinstance(right_formula, Or):
-          new_sequent = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          del new_sequent.right[right_formula]
-          new_sequent.right[right_formula.formula_a] = \
-            old_sequent.right[right_formula] + 1
-          new_sequent.right[right_formula.formula_b] = \
-            old_sequent.right[right_formula] + 1
-          if new_sequent.siblings is not None:
-            new_sequent.siblings.add(new_sequent)
-          frontier.append(new_sequent)
-          break
-        if isinstance(right_formula, Implies):
-          new_sequent = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          del new_sequent.right[right_formula]
-          new_sequent.left[right_formula.formula_a] = \
-            old_sequent.right[right_formula] + 1
-          new_sequent.right[right_formula.formula_b] = \
-            old_sequent.right[right_formula] + 1
-          if new_sequent.siblings is not None:
-            new_sequent.siblings.add(new_sequent)
-          frontier.append(new_sequent)
-          break
-        if isinstance(right_formula, ForAll):
-          new_sequent = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings,
-            old_sequent.depth + 1
-          )
-          del new_sequent.right[right_formula]
-          variable = Variable(old_sequent.getVariableName('v'))
-          formula = right_formula.formula.replace(right_formula.variable,
-            variable)
-          formula.setInstantiationTime(old_sequent.depth + 1)
-          new_sequent.right[formula] = old_sequent.right[right_formula] + 1
-          if new_sequent.siblings is not None:
-            new_sequent.siblings.add(new_sequent)
-          frontier.append(new_sequent)
-          break
-        if isinstance(right_formula, ThereExists):
-          new_sequent = Sequent(
-            old_sequent.left.copy(),
-            old_sequent.right.copy(),
-            old_sequent.siblings or set(),
-            old_sequent.depth + 1
-          )
-          new_sequent.right[right_formula] += 1
-          formula = right_formula.formula.replace(
-            right_formula.variable,
-            UnificationTerm(old_sequent.getVariableName('t'))
-          )
-          formula.setInstantiationTime(old_sequent.depth + 1)
-          if formula not in new_sequent.right:
-            new_sequent.right[formula] = new_sequent.right[right_formula]
-          if new_sequent.siblings is not None:
-            new_sequent.siblings.add(new_sequent)
-          frontier.append(new_sequent)
-          break
+    # the new sequents are appended to the frontier after this point
+    size = len(frontier)
+
+    mark = time.perf_counter()
+    side, formula = expandSequent(old_sequent, frontier, strategy)
+    phases['expansion'] += time.perf_counter() - mark
+    if side is None:
+      statistics.proven = len(proven)
+      statistics.seconds = time.monotonic() - start
+      if weakened:
+        statistics.exhausted = 'instantiation limit of %s reached' % \
+          strategy.max_instantiations
+        return None,log
+      if statistics.closures_abandoned > abandoned:
+        statistics.exhausted = 'limit of %s unifications per closure ' \
+          'reached' % limits.max_unifications
+        return None,log
+      return False,log
+    if side == 'weaken':
+      weakened = True
+
+    # record the rule which was applied
+    statistics.count(side, formula)
+    mark = time.perf_counter()
+    premises = [frontier[index] for index in range(size, len(frontier))]
+    log.expanded(old_sequent, side, formula, premises)
+    phases['logging'] += time.perf_counter() - mark
 
   # no more sequents to prove
-  return True,output
+  statistics.proven = len(proven)
+  statistics.seconds = time.monotonic() - start
+  return True,log
+
+##############################################################################
+# Processes
+##############################################################################
+
+# runs in a worker process: calls the function on each argument received
+# and sends back the result, or the exception, until it receives None
+def serveCalls(function, connection):
+  while True:
+    argument = connection.recv()
+    if argument is None:
+      break
+    try:
+      result = (True, function(argument))
+    except Exception as e:
+      result = (False, e)
+    connection.send(result)
+  connection.close()
+
+# calls the function on each argument in a set of worker processes and
+# yields the results as they come in; the workers still busy are killed when
+# the generator is closed; each worker has a pipe of its own, since a worker
+# killed while it held the lock of a shared queue (as the workers of a Pool
+# share one) would leave the lock held and the other processes hung
+def runProcesses(function, arguments, processes):
+  pending = deque(arguments)
+  workers = {}
+  try:
+    for index in range(min(processes, len(pending))):
+      connection, worker_connection = multiprocessing.Pipe()
+      worker = multiprocessing.Process(target=serveCalls,
+        args=(function, worker_connection), daemon=True)
+      worker.start()
+      worker_connection.close()
+      connection.send(pending.popleft())
+      workers[connection] = worker
+    busy = list(workers)
+    while len(busy) > 0:
+      for connection in wait(busy):
+        try:
+          succeeded, result = connection.recv()
+        except EOFError:
+          workers[connection].join()
+          raise ChildProcessError('A worker process exited with code %s.' %
+            workers[connection].exitcode)
+        if len(pending) > 0:
+          connection.send(pending.popleft())
+        else:
+          # no more work for this worker
+          connection.send(None)
+          connection.close()
+          busy.remove(connection)
+        if not succeeded:
+          raise result
+        yield result
+  finally:
+    for connection, worker in workers.items():
+      if not connection.closed:
+        worker.terminate()
+        connection.close()
+      worker.join()
+
+##############################################################################
+# Parallel proof search
+##############################################################################
+
+# a sequent without siblings shares no unification terms with any other
+# sequent, so it can be proven on its own, and a proof needs all of them;
+# the parallel search expands the sequent breadth-first here until there are
+# enough such branches (stopping at each rule which would give a branch
+# siblings), proves the branches in a set of worker processes and gives up
+# on the rest as soon as one of them is not provable
+
+# runs in a worker process
+def proveBranch(arguments):
+  sequent, limits, strategy = arguments
+  statistics = SearchStatistics()
+  result,log = proveStrategy(sequent, strategy, limits, statistics, NullLog())
+  return result, statistics
+
+# like proveSequent, but only the expansion done before the branches are
+# handed out is logged and the limits apply to each branch separately;
+# processes defaults to one per CPU and branches to four per process, and the
+# strategy, if given, is used for the expansion and for each branch
+def proveSequentParallel(sequent, limits=None, statistics=None, log=None,
+  processes=0, branches=None, strategy=None):
+  if log is None:
+    log = ProofLog()
+  if statistics is None:
+    statistics = SearchStatistics()
+  if strategy is None:
+    strategy = Strategy()
+  if sequent.siblings is not None:
+    return proveStrategy(sequent, strategy, limits, statistics, log)
+  processes = processes or os.cpu_count() or 1
+  if branches is None:
+    branches = processes * 4
+  start = time.monotonic()
+  weakened = False
+
+  # split the sequent into independent branches
+  frontier = deque([sequent])
+  independent = []
+  while len(frontier) > 0 and len(frontier) + len(independent) < branches:
+    old_sequent = frontier.popleft()
+    statistics.sequents += 1
+    statistics.depth = max(statistics.depth, old_sequent.depth)
+    log.sequent(old_sequent)
+    axiom = old_sequent.left.firstShared(old_sequent.right)
+    if axiom is not None:
+      log.axiom(old_sequent, axiom)
+      statistics.axioms += 1
+      statistics.proven += 1
+      continue
+    new_sequents = deque()
+    side, formula = expandSequent(old_sequent, new_sequents, strategy)
+    if side is None:
+      statistics.seconds = time.monotonic() - start
+      if weakened:
+        statistics.exhausted = 'instantiation limit of %s reached' % \
+          strategy.max_instantiations
+        return None,log
+      return False,log
+    if side == 'weaken':
+      weakened = True
+    if any([new_sequent.siblings is not None
+      for new_sequent in new_sequents]):
+      independent.append(old_sequent)
+      continue
+    statistics.count(side, formula)
+    log.expanded(old_sequent, side, formula, new_sequents)
+    frontier.extend(new_sequents)
+  independent.extend(frontier)
+
+  # prove the branches
+  result = True
+  results = runProcesses(proveBranch, [(branch, limits, strategy)
+    for branch in independent], processes)
+  try:
+    for branch_result, branch_statistics in results:
+      statistics.merge(branch_statistics)
+      if branch_result is False:
+        result = False
+        break
+      if branch_result is None:
+        result = None
+        statistics.exhausted = branch_statistics.exhausted
+  finally:
+    results.close()
+  statistics.seconds = time.monotonic() - start
+  return result,log
+
+##############################################################################
+# Portfolios
+##############################################################################
+
+# runs the search under the strategy, under each of its depth bounds in turn
+# if it has any; a search cut short by a bound is restarted under the next
+# one, and the limits cover all of them, so the sequents expanded by each
+# count against one budget; each search is logged afresh and only the one
+# which gives the answer is kept in the log
+def proveStrategy(sequent, strategy, limits=None, statistics=None, log=None):
+  if strategy is None:
+    strategy = Strategy()
+  if log is None:
+    log = ProofLog()
+  if limits is None:
+    limits = ResourceLimits()
+  if statistics is None:
+    statistics = SearchStatistics()
+  start = time.monotonic()
+  for bound in (strategy.deepening or []):
+    if limits.max_depth is not None and bound >= limits.max_depth:
+      break
+    bound_log = DeferredLog()
+    result,bound_log = proveSequent(sequent, remainingLimits(limits, start,
+      bound), statistics, bound_log, strategy)
+    if result is not None or statistics.depth <= bound:
+      bound_log.replay(log)
+      statistics.seconds = time.monotonic() - start
+      return result,log
+  result,log = proveSequent(sequent, remainingLimits(limits, start,
+    limits.max_depth), statistics, log, strategy)
+  statistics.seconds = time.monotonic() - start
+  return result,log
+
+# the limits left to a search restarted under a depth bound; the statistics
+# are carried over from one search to the next, so only the time is reset
+def remainingLimits(limits, start, max_depth):
+  timeout = limits.timeout
+  if timeout is not None:
+    timeout = max(0, timeout - (time.monotonic() - start))
+  return ResourceLimits(timeout, limits.max_sequents, max_depth,
+    limits.max_frontier, limits.max_memory)
+
+# runs in a worker process
+def proveWithStrategy(arguments):
+  sequent, strategy, limits = arguments
+  statistics = SearchStatistics()
+  result,log = proveStrategy(sequent, strategy, limits, statistics, NullLog())
+  return result, statistics, strategy
+
+# runs the search under each strategy in its own process and returns the
+# first answer which is not None, or None if every search hits a limit; the
+# other searches are killed then, and the strategy which gave the answer is
+# kept in the statistics; nothing is logged, as in the parallel search
+def provePortfolio(sequent, strategies=None, limits=None, statistics=None,
+  log=None):
+  if log is None:
+    log = ProofLog()
+  if strategies is None:
+    strategies = PORTFOLIO
+  results = runProcesses(proveWithStrategy, [(sequent, strategy, limits)
+    for strategy in strategies], len(strategies))
+  try:
+    for result, strategy_statistics, strategy in results:
+      if statistics is not None:
+        statistics.__dict__.update(strategy_statistics.__dict__)
+      if result is not None:
+        if statistics is not None:
+          statistics.strategy = strategy
+        return result,log
+  finally:
+    results.close()
+  return None,log
+
+# the sequent which proves the formula from the axioms
+def formulaSequent(axioms, formula):
+  return Sequent(
+    FormulaMap({ axiom: 0 for axiom in axioms }),
+    FormulaMap({ formula: 0 }),
+    None,
+    0,
+    { }
+  )
+
+# decides a propositional formula with the SAT solver; only the time limit
+# applies
+def provePropositionalFormula(axioms, formula, limits=None, statistics=None,
+  log=None):
+  if log is None:
+    log = ProofLog()
+  if limits is None:
+    limits = ResourceLimits()
+  if statistics is None:
+    statistics = SearchStatistics()
+  start = time.monotonic()
+  result = provePropositional(axioms, formula, limits.timeout)
+  statistics.seconds = time.monotonic() - start
+  if result is None:
+    statistics.exhausted = 'time limit of %s seconds reached' % limits.timeout
+  return result,log
 
 # returns True if the formula is provable
 # returns False or loops forever if the formula is not provable
-def proveFormula(axioms, formula):
-  return proveSequent(Sequent(
-    { axiom: 0 for axiom in axioms },
-    { formula: 0 },
-    None,
-    0
-  ))
+# returns None if one of the limits is reached first
+# if processes is given, independent branches are proven in parallel
+# the strategy, if given, is used for the search (and for each branch of a
+# parallel search); a list of strategies is run as a portfolio instead, one
+# process each, so processes may not be given with one
+# if the axioms and the formula have no quantifiers they are decided by the
+# SAT solver instead, which always terminates; it finds no proof to log, so
+# this is only done for a log which records nothing (a NullLog) and when
+# propositional is True; with no log the search is logged to a ProofLog
+# engine is 'sequent' for the sequent calculus search or 'resolution' for
+# saturation of the clausal form, which logs nothing either
+# the cache, if given, is asked first (unless a proof tree is wanted) and
+# told the answer
+def proveFormula(axioms, formula, limits=None, statistics=None, log=None,
+  processes=None, strategy=None, propositional=True, engine='sequent',
+  cache=None):
+  if statistics is None:
+    statistics = SearchStatistics()
+  if cache is not None and not isinstance(log, ProofTree):
+    result = cache.get(axioms, formula)
+    if result is not None:
+      statistics.engine = 'cache'
+      if log is None:
+        log = ProofLog()
+      return result,log
+    result,log = proveFormula(axioms, formula, limits, statistics, log,
+      processes, strategy, propositional, engine)
+    cache.put(axioms, formula, result)
+    return result,log
+  if propositional and log is not None and not log.records and \
+    isPropositional(formula) and \
+    all([isPropositional(axiom) for axiom in axioms]):
+    statistics.engine = 'sat'
+    return provePropositionalFormula(axioms, formula, limits, statistics, log)
+  statistics.engine = engine
+  if engine == 'resolution':
+    # the resolution module builds on this one, so it is imported late
+    from resolution import proveResolution
+    if log is None:
+      log = ProofLog()
+    return proveResolution(axioms, formula, limits, statistics),log
+  if engine != 'sequent':
+    raise ValueError('Unknown engine: %s.' % engine)
+  sequent = formulaSequent(axioms, formula)
+  if isinstance(strategy, list):
+    if processes is not None:
+      raise ValueError('A portfolio runs one process per strategy, so it ' \
+        'cannot be given processes.')
+    return provePortfolio(sequent, strategy, limits, statistics, log)
+  if processes is not None:
+    return proveSequentParallel(sequent, limits, statistics, log, processes,
+      strategy=strategy)
+  if strategy is not None:
+    return proveStrategy(sequent, strategy, limits, statistics, log)
+  return proveSequent(sequent, limits, statistics, log)
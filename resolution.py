@@ -0,0 +1,312 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+from language import *
+from prover import unify, unify_choices, ResourceLimits, SearchStatistics
+from collections import deque
+from itertools import count
+import heapq
+import time
+
+##############################################################################
+# Clausal normal form
+##############################################################################
+
+# push negations down to the predicates and remove implications
+def nnf(formula, positive=True):
+  if isinstance(formula, Predicate):
+    return formula if positive else Not(formula)
+  if isinstance(formula, Not):
+    return nnf(formula.formula, not positive)
+  if isinstance(formula, And):
+    if positive:
+      return And(nnf(formula.formula_a), nnf(formula.formula_b))
+    return Or(nnf(formula.formula_a, False), nnf(formula.formula_b, False))
+  if isinstance(formula, Or):
+    if positive:
+      return Or(nnf(formula.formula_a), nnf(formula.formula_b))
+    return And(nnf(formula.formula_a, False), nnf(formula.formula_b, False))
+  if isinstance(formula, Implies):
+    if positive:
+      return Or(nnf(formula.formula_a, False), nnf(formula.formula_b))
+    return And(nnf(formula.formula_a), nnf(formula.formula_b, False))
+  if isinstance(formula, ForAll):
+    if positive:
+      return ForAll(formula.variable, nnf(formula.formula))
+    return ThereExists(formula.variable, nnf(formula.formula, False))
+  if positive:
+    return ThereExists(formula.variable, nnf(formula.formula))
+  return ForAll(formula.variable, nnf(formula.formula, False))
+
+# replace each universally quantified variable of a formula in negation
+# normal form with a unification term and each existentially quantified one
+# with a Skolem function of the unification terms it depends on; free
+# variables are left alone, so they act as constants, as in the sequent
+# calculus; names ends with the numbers for the new symbols
+def skolemize(formula, names, universals=()):
+  if isinstance(formula, And):
+    return And(skolemize(formula.formula_a, names, universals),
+      skolemize(formula.formula_b, names, universals))
+  if isinstance(formula, Or):
+    return Or(skolemize(formula.formula_a, names, universals),
+      skolemize(formula.formula_b, names, universals))
+  if isinstance(formula, ForAll):
+    term = UnificationTerm('u#%d' % next(names))
+    return skolemize(formula.formula.replace(formula.variable, term), names,
+      universals + (term,))
+  if isinstance(formula, ThereExists):
+    free = formula.formula.freeUnificationTerms()
+    term = Function('sk#%d' % next(names),
+      [universal for universal in universals if universal in free])
+    return skolemize(formula.formula.replace(formula.variable, term), names,
+      universals)
+  return formula
+
+# the clauses of a skolemized formula in negation normal form, as lists of
+# (positive, predicate) literals
+def cnf(formula):
+  if isinstance(formula, And):
+    return cnf(formula.formula_a) + cnf(formula.formula_b)
+  if isinstance(formula, Or):
+    return [clause_a + clause_b for clause_a in cnf(formula.formula_a)
+      for clause_b in cnf(formula.formula_b)]
+  if isinstance(formula, Not):
+    return [[(False, formula.formula)]]
+  return [[(True, formula)]]
+
+##############################################################################
+# Clauses
+##############################################################################
+
+# rebuild a term or predicate with its unification terms renamed; new makes
+# the name for the nth unification term met
+def rename(term, mapping, new):
+  if isinstance(term, UnificationTerm):
+    if term not in mapping:
+      mapping[term] = new(len(mapping) + 1)
+    return mapping[term]
+  if isinstance(term, Function):
+    return Function(term.name, [rename(subterm, mapping, new)
+      for subterm in term.terms])
+  if isinstance(term, Predicate):
+    return Predicate(term.name, [rename(subterm, mapping, new)
+      for subterm in term.terms])
+  return term
+
+def canonicalVariable(index):
+  return UnificationTerm('X%d' % index)
+
+def apartVariable(index):
+  return UnificationTerm('Y%d' % index)
+
+def frozenVariable(index):
+  return Variable('X#%d' % index)
+
+def size(term):
+  if isinstance(term, Function) or isinstance(term, Predicate):
+    return 1 + sum([size(subterm) for subterm in term.terms])
+  return 1
+
+def applyPredicate(substitution, predicate):
+  return Predicate(predicate.name, [substitution.apply(term)
+    for term in predicate.terms])
+
+# a disjunction of literals whose unification terms are named X1, X2, ... in
+# order of occurrence, so that equal clauses have equal keys
+class Clause:
+  ids = count()
+
+  def __init__(self, literals):
+    mapping = {}
+    self.literals = []
+    for positive, predicate in literals:
+      literal = (positive, rename(predicate, mapping, canonicalVariable))
+      if literal not in self.literals:
+        self.literals.append(literal)
+    self.literals = tuple(self.literals)
+    self.key = frozenset(self.literals)
+    self.weight = sum([size(predicate) for positive, predicate
+      in self.literals])
+    self.id = next(Clause.ids)
+    self.selected = False
+    self.removed = False
+
+  def isTautology(self):
+    return any([(not positive, predicate) in self.key
+      for positive, predicate in self.literals])
+
+  # the literals with the unification terms renamed to Y1, Y2, ...
+  def apart(self):
+    mapping = {}
+    return [(positive, rename(predicate, mapping, apartVariable))
+      for positive, predicate in self.literals]
+
+  # the literals with the unification terms turned into variables, which
+  # only unify with themselves
+  def frozen(self):
+    mapping = {}
+    return [(positive, rename(predicate, mapping, frozenVariable))
+      for positive, predicate in self.literals]
+
+  # whether some instance of this clause is a subset of the other clause
+  def subsumes(self, other):
+    if len(self.literals) > len(other.literals):
+      return False
+    frozen = other.frozen()
+    pair_lists = []
+    for positive, predicate in self.literals:
+      pairs = [(predicate, other_predicate)
+        for other_positive, other_predicate in frozen
+        if other_positive == positive and
+          other_predicate.name == predicate.name and
+          len(other_predicate.terms) == len(predicate.terms)]
+      if len(pairs) == 0:
+        return False
+      pair_lists.append(pairs)
+    return unify_choices(pair_lists, {}) is not None
+
+  def __str__(self):
+    if len(self.literals) == 0:
+      return '⊥'
+    return ' ∨ '.join([str(predicate) if positive else '¬' + str(predicate)
+      for positive, predicate in self.literals])
+
+def literalKey(literal):
+  positive, predicate = literal
+  return (positive, predicate.name, len(predicate.terms))
+
+##############################################################################
+# Saturation
+##############################################################################
+
+# the given-clause loop: the passive clause picked next is the lightest one,
+# except that every few picks the oldest one is taken so that no clause
+# waits forever; the given clause is dropped if an active clause subsumes
+# it, removes the active clauses it subsumes, and is resolved and factored
+# against the active clauses (itself included) through an index of their
+# literals by sign, name and arity
+class Saturation:
+  age_ratio = 5
+
+  def __init__(self):
+    self.passive_weights = []
+    self.passive_ages = deque()
+    self.passive = 0
+    self.seen = set()
+    self.active = []
+    self.literal_index = {}
+    self.subsumption_index = {}
+    self.refuted = False
+
+  def add(self, literals):
+    clause = Clause(literals)
+    if clause.key in self.seen or clause.isTautology():
+      return
+    self.seen.add(clause.key)
+    if len(clause.literals) == 0:
+      self.refuted = True
+    heapq.heappush(self.passive_weights, (clause.weight, clause.id, clause))
+    self.passive_ages.append(clause)
+    self.passive += 1
+
+  # the next passive clause, or None
+  def select(self, step):
+    while self.passive > 0:
+      if step % Saturation.age_ratio == 0:
+        clause = self.passive_ages.popleft()
+      else:
+        clause = heapq.heappop(self.passive_weights)[2]
+      if clause.selected:
+        continue
+      clause.selected = True
+      self.passive -= 1
+      return clause
+    return None
+
+  def subsumed(self, clause):
+    for key in set([literalKey(literal) for literal in clause.literals]):
+      for other in self.subsumption_index.get(key, []):
+        if not other.removed and other.subsumes(clause):
+          return True
+    return False
+
+  def activate(self, clause):
+    # remove the active clauses which the new one subsumes
+    for other in self.active:
+      if not other.removed and clause.subsumes(other):
+        other.removed = True
+    self.active = [other for other in self.active if not other.removed]
+    self.active.append(clause)
+    for index, literal in enumerate(clause.literals):
+      self.literal_index.setdefault(literalKey(literal), []).append(
+        (clause, index))
+    self.subsumption_index.setdefault(literalKey(clause.literals[0]),
+      []).append(clause)
+
+  def infer(self, clause):
+    # binary resolution
+    for index, (positive, predicate) in enumerate(clause.literals):
+      key = (not positive, predicate.name, len(predicate.terms))
+      for other, other_index in self.literal_index.get(key, []):
+        if other.removed:
+          continue
+        literals = other.apart()
+        substitution = unify(predicate, literals[other_index][1], {})
+        if substitution is None:
+          continue
+        self.add([(sign, applyPredicate(substitution, atom))
+          for position, (sign, atom) in enumerate(clause.literals)
+          if position != index] +
+          [(sign, applyPredicate(substitution, atom))
+          for position, (sign, atom) in enumerate(literals)
+          if position != other_index])
+        if self.refuted:
+          return
+
+    # factoring
+    for index, (positive, predicate) in enumerate(clause.literals):
+      for other_index in range(index + 1, len(clause.literals)):
+        other_positive, other_predicate = clause.literals[other_index]
+        if other_positive != positive:
+          continue
+        substitution = unify(predicate, other_predicate, {})
+        if substitution is not None:
+          self.add([(sign, applyPredicate(substitution, atom))
+            for sign, atom in clause.literals])
+
+# returns True if the formula follows from the axioms, False if the clauses
+# saturate without a refutation, or None if one of the limits is reached
+# first (only the time, sequent and memory limits apply; the sequent limit
+# bounds the given clauses)
+def proveResolution(axioms, formula, limits=None, statistics=None):
+  if limits is None:
+    limits = ResourceLimits()
+  if statistics is None:
+    statistics = SearchStatistics()
+  start = time.monotonic()
+  names = count(1)
+  saturation = Saturation()
+  for premise in list(axioms) + [Not(formula)]:
+    for literals in cnf(skolemize(nnf(premise), names)):
+      saturation.add(literals)
+
+  step = 0
+  while not saturation.refuted:
+    step += 1
+    clause = saturation.select(step)
+    if clause is None:
+      statistics.seconds = time.monotonic() - start
+      return False
+    statistics.sequents += 1
+    statistics.frontier = max(statistics.frontier, saturation.passive)
+    statistics.proven = len(saturation.active)
+    statistics.seconds = time.monotonic() - start
+    statistics.exhausted = limits.exceeded(statistics)
+    if statistics.exhausted is not None:
+      return None
+    if saturation.subsumed(clause):
+      continue
+    saturation.activate(clause)
+    saturation.infer(clause)
+  statistics.seconds = time.monotonic() - start
+  return True
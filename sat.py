@@ -0,0 +1,317 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+from language import *
+import heapq
+import time
+
+##############################################################################
+# CDCL solver
+##############################################################################
+
+# variables are numbered from 1 and a literal is a variable or its negation;
+# clauses are lists of literals whose first two literals are watched, and
+# conflicts are analyzed to the first unique implication point, learned and
+# backjumped over; decisions follow variable activity (with saved phases)
+# and the search restarts on the Luby sequence
+class Solver:
+  decay = 0.95
+  restart_base = 100
+
+  def __init__(self):
+    self.variables = 0
+    self.clauses = []
+    self.learnts = []
+    self.watches = {}
+    self.values = [0]
+    self.levels = [0]
+    self.reasons = [None]
+    self.activity = [0.0]
+    self.phases = [False]
+    self.order = []
+    self.increment = 1.0
+    self.trail = []
+    self.trail_limits = []
+    self.head = 0
+    self.ok = True
+    self.conflicts = 0
+
+  def newVariable(self):
+    self.variables += 1
+    variable = self.variables
+    self.watches[variable] = []
+    self.watches[-variable] = []
+    self.values.append(0)
+    self.levels.append(0)
+    self.reasons.append(None)
+    self.activity.append(0.0)
+    self.phases.append(False)
+    heapq.heappush(self.order, (0.0, variable))
+    return variable
+
+  # 1 if the literal is true, -1 if it is false and 0 if it is unassigned
+  def value(self, literal):
+    if literal > 0:
+      return self.values[literal]
+    return -self.values[-literal]
+
+  def level(self):
+    return len(self.trail_limits)
+
+  # clauses may only be added before solving
+  def addClause(self, literals):
+    clause = []
+    for literal in literals:
+      if -literal in clause:
+        return
+      if literal not in clause and self.value(literal) != -1:
+        clause.append(literal)
+      if self.value(literal) == 1:
+        return
+    if len(clause) == 0:
+      self.ok = False
+    elif len(clause) == 1:
+      self.assign(clause[0], None)
+      if self.propagate() is not None:
+        self.ok = False
+    else:
+      self.clauses.append(clause)
+      self.watches[clause[0]].append(clause)
+      self.watches[clause[1]].append(clause)
+
+  def assign(self, literal, reason):
+    variable = abs(literal)
+    self.values[variable] = 1 if literal > 0 else -1
+    self.levels[variable] = self.level()
+    self.reasons[variable] = reason
+    self.trail.append(literal)
+
+  # returns a clause which is false, or None
+  def propagate(self):
+    while self.head < len(self.trail):
+      false_literal = -self.trail[self.head]
+      self.head += 1
+      watchers = self.watches[false_literal]
+      kept = []
+      for index, clause in enumerate(watchers):
+        # keep the false literal second
+        if clause[0] == false_literal:
+          clause[0], clause[1] = clause[1], clause[0]
+        if self.value(clause[0]) == 1:
+          kept.append(clause)
+          continue
+
+        # look for another literal to watch
+        for position in range(2, len(clause)):
+          if self.value(clause[position]) != -1:
+            clause[1], clause[position] = clause[position], clause[1]
+            self.watches[clause[1]].append(clause)
+            break
+        else:
+          kept.append(clause)
+          if self.value(clause[0]) == -1:
+            kept.extend(watchers[index + 1:])
+            self.watches[false_literal] = kept
+            return clause
+          self.assign(clause[0], clause)
+      self.watches[false_literal] = kept
+    return None
+
+  def bump(self, variable):
+    self.activity[variable] += self.increment
+    if self.activity[variable] > 1e100:
+      self.activity = [activity * 1e-100 for activity in self.activity]
+      self.increment *= 1e-100
+      self.order = [(-self.activity[other], other)
+        for other in range(1, self.variables + 1)
+        if self.values[other] == 0]
+      heapq.heapify(self.order)
+    elif self.values[variable] == 0:
+      heapq.heappush(self.order, (-self.activity[variable], variable))
+
+  # returns the learned clause, asserting literal first and a literal of the
+  # backjump level second, and the backjump level
+  def analyze(self, conflict):
+    learnt = [None]
+    seen = set()
+    pending = 0
+    literal = None
+    clause = conflict
+    index = len(self.trail) - 1
+    while True:
+      for other in (clause if literal is None else clause[1:]):
+        variable = abs(other)
+        if variable not in seen and self.levels[variable] > 0:
+          seen.add(variable)
+          self.bump(variable)
+          if self.levels[variable] == self.level():
+            pending += 1
+          else:
+            learnt.append(other)
+      while abs(self.trail[index]) not in seen:
+        index -= 1
+      literal = self.trail[index]
+      index -= 1
+      clause = self.reasons[abs(literal)]
+      pending -= 1
+      if pending == 0:
+        break
+    learnt[0] = -literal
+    level = 0
+    if len(learnt) > 1:
+      position = max(range(1, len(learnt)),
+        key=lambda position: self.levels[abs(learnt[position])])
+      learnt[1], learnt[position] = learnt[position], learnt[1]
+      level = self.levels[abs(learnt[1])]
+    return learnt, level
+
+  def backtrack(self, level):
+    if self.level() <= level:
+      return
+    start = self.trail_limits[level]
+    for literal in self.trail[start:]:
+      variable = abs(literal)
+      self.phases[variable] = literal > 0
+      self.values[variable] = 0
+      self.reasons[variable] = None
+      heapq.heappush(self.order, (-self.activity[variable], variable))
+    del self.trail[start:]
+    del self.trail_limits[level:]
+    self.head = len(self.trail)
+
+  # the unassigned variable of greatest activity, or None
+  def decide(self):
+    while len(self.order) > 0:
+      activity, variable = heapq.heappop(self.order)
+      if self.values[variable] == 0:
+        return variable
+    return None
+
+  # returns True if the clauses are satisfiable and False if they are not;
+  # returns None if the timeout (in seconds) runs out first
+  def solve(self, timeout=None):
+    if not self.ok:
+      return False
+    start = time.monotonic()
+    restarts = 0
+    limit = Solver.restart_base * luby(restarts)
+    conflicts = 0
+    while True:
+      conflict = self.propagate()
+      if conflict is not None:
+        self.conflicts += 1
+        conflicts += 1
+        if self.level() == 0:
+          self.ok = False
+          return False
+        learnt, level = self.analyze(conflict)
+        self.backtrack(level)
+        if len(learnt) == 1:
+          self.assign(learnt[0], None)
+        else:
+          self.learnts.append(learnt)
+          self.watches[learnt[0]].append(learnt)
+          self.watches[learnt[1]].append(learnt)
+          self.assign(learnt[0], learnt)
+        self.increment /= Solver.decay
+        if timeout is not None and self.conflicts % 256 == 0 and \
+          time.monotonic() - start > timeout:
+          self.backtrack(0)
+          return None
+        if conflicts >= limit:
+          self.backtrack(0)
+          restarts += 1
+          limit = Solver.restart_base * luby(restarts)
+          conflicts = 0
+      else:
+        variable = self.decide()
+        if variable is None:
+          return True
+        self.trail_limits.append(len(self.trail))
+        self.assign(variable if self.phases[variable] else -variable, None)
+
+  # the value of each variable after solve() returned True
+  def model(self):
+    return [self.values[variable] > 0
+      for variable in range(1, self.variables + 1)]
+
+# the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, ... (from index 0)
+def luby(index):
+  size = 1
+  power = 0
+  while size < index + 1:
+    power += 1
+    size = 2 * size + 1
+  while size - 1 != index:
+    size = (size - 1) >> 1
+    power -= 1
+    index = index % size
+  return 1 << power
+
+##############################################################################
+# Tseitin encoding
+##############################################################################
+
+# a formula without quantifiers is propositional: each predicate is an atom,
+# since without quantifiers its terms are never instantiated
+def isPropositional(formula):
+  if isinstance(formula, Predicate):
+    return True
+  if isinstance(formula, Not):
+    return isPropositional(formula.formula)
+  if isinstance(formula, And) or isinstance(formula, Or) or \
+    isinstance(formula, Implies):
+    return isPropositional(formula.formula_a) and \
+      isPropositional(formula.formula_b)
+  return False
+
+# gives each subformula a literal which the clauses make equivalent to it;
+# formulae are hash-consed, so shared subformulae are encoded once
+class Encoding:
+  def __init__(self, solver):
+    self.solver = solver
+    self.literals = {}
+
+  def literal(self, formula):
+    literal = self.literals.get(formula)
+    if literal is not None:
+      return literal
+    if isinstance(formula, Not):
+      literal = -self.literal(formula.formula)
+    elif isinstance(formula, Predicate):
+      literal = self.solver.newVariable()
+    else:
+      literal_a = self.literal(formula.formula_a)
+      literal_b = self.literal(formula.formula_b)
+      literal = self.solver.newVariable()
+      if isinstance(formula, And):
+        self.solver.addClause([-literal, literal_a])
+        self.solver.addClause([-literal, literal_b])
+        self.solver.addClause([literal, -literal_a, -literal_b])
+      elif isinstance(formula, Or):
+        self.solver.addClause([-literal, literal_a, literal_b])
+        self.solver.addClause([literal, -literal_a])
+        self.solver.addClause([literal, -literal_b])
+      else:
+        self.solver.addClause([-literal, -literal_a, literal_b])
+        self.solver.addClause([literal, literal_a])
+        self.solver.addClause([literal, -literal_b])
+    self.literals[formula] = literal
+    return literal
+
+  def assertFormula(self, formula):
+    self.solver.addClause([self.literal(formula)])
+
+# returns True if the formula follows from the axioms, all of which must be
+# propositional, and False if it does not; returns None if the timeout (in
+# seconds) runs out first
+def provePropositional(axioms, formula, timeout=None):
+  solver = Solver()
+  encoding = Encoding(solver)
+  for axiom in axioms:
+    encoding.assertFormula(axiom)
+  encoding.assertFormula(Not(formula))
+  result = solver.solve(timeout)
+  if result is None:
+    return None
+  return not result
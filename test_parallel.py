@@ -0,0 +1,118 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+# checks that sequents handed to worker processes are proven there as they
+# are here; spawned workers hash strings with another seed than this
+# process, so a sequent which kept the hashes of this process would be
+# looked up wrongly there; also checks the strategies the workers run
+
+from prover import *
+from TheoremProver import parseText
+import multiprocessing
+import pickle
+import unittest
+
+PROBLEMS = [
+  (['forall x. Men(x) implies Mortal(x)', 'Men(socrates)'],
+    'Mortal(socrates)', True),
+  (['forall x. Men(x) implies Mortal(x)', 'forall x. Greek(x) implies Men(x)'],
+    'forall x. (Greek(x) implies Mortal(x))', True),
+  (['Married(alex)', 'forall x. Married(x) implies HaveSpouse(x)'],
+    'HaveSpouse(alex) and (Married(alex) or Single(alex))', True),
+  (['A implies B', 'not A'], 'not B', False),
+  ([], 'exists x. (P(x) implies forall y. P(y))', True),
+]
+
+def problemSequent(axioms, formula):
+  return formulaSequent([parseText(axiom) for axiom in axioms],
+    parseText(formula))
+
+class ParallelTest(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    cls.pool = multiprocessing.get_context('spawn').Pool(2)
+
+  @classmethod
+  def tearDownClass(cls):
+    cls.pool.terminate()
+    cls.pool.join()
+
+  def testPickledSequent(self):
+    for axioms, formula, expected in PROBLEMS:
+      sequent = problemSequent(axioms, formula)
+      copy = pickle.loads(pickle.dumps(sequent))
+      self.assertEqual(copy, sequent)
+      self.assertEqual(hash(copy), hash(sequent))
+      self.assertEqual(list(copy.left), list(sequent.left))
+      self.assertEqual(list(copy.right), list(sequent.right))
+
+  def testSpawnedBranches(self):
+    limits = ResourceLimits(max_sequents=10000)
+    for axioms, formula, expected in PROBLEMS:
+      sequent = problemSequent(axioms, formula)
+      result, statistics = self.pool.apply(proveBranch,
+        ((sequent, limits, None),))
+      self.assertEqual(result, expected, formula)
+
+  # the whole parallel search, with every pool spawning its workers
+  def testSpawnedSearch(self):
+    method = multiprocessing.get_start_method(allow_none=True)
+    multiprocessing.set_start_method('spawn', force=True)
+    try:
+      limits = ResourceLimits(max_sequents=10000)
+      for axioms, formula, expected in PROBLEMS:
+        result,log = proveFormula([parseText(axiom) for axiom in axioms],
+          parseText(formula), limits, None, NullLog(), processes=2,
+          propositional=False)
+        self.assertEqual(result, expected, formula)
+    finally:
+      multiprocessing.set_start_method(method, force=True)
+
+  # the portfolio, with its workers spawned
+  def testSpawnedPortfolio(self):
+    method = multiprocessing.get_start_method(allow_none=True)
+    multiprocessing.set_start_method('spawn', force=True)
+    try:
+      limits = ResourceLimits(max_sequents=10000)
+      for axioms, formula, expected in PROBLEMS:
+        statistics = SearchStatistics()
+        result,log = provePortfolio(problemSequent(axioms, formula), None,
+          limits, statistics)
+        self.assertEqual(result, expected, formula)
+        self.assertIn(str(statistics.strategy),
+          [str(strategy) for strategy in PORTFOLIO])
+    finally:
+      multiprocessing.set_start_method(method, force=True)
+
+class StrategyTest(unittest.TestCase):
+  # the searches cut short by a depth bound are left out of the log
+  def testDeepeningLog(self):
+    for axioms, formula, expected in PROBLEMS:
+      log = ProofLog(False)
+      result,log = proveStrategy(problemSequent(axioms, formula),
+        Strategy(deepening=[1, 2, 4]), ResourceLimits(max_sequents=10000),
+        None, log)
+      plain_log = ProofLog(False)
+      plain_result,plain_log = proveSequent(problemSequent(axioms, formula),
+        ResourceLimits(max_sequents=10000), None, plain_log)
+      self.assertEqual(result, plain_result, formula)
+      self.assertEqual(list(log), list(plain_log), formula)
+
+  # the searches under each depth bound share the sequent budget
+  def testDeepeningBudget(self):
+    statistics = SearchStatistics()
+    result,log = proveStrategy(problemSequent(
+      ['forall x. P(x) implies P(f(x))', 'P(a)'], 'Q(a)'),
+      Strategy(deepening=[2, 4, 8]), ResourceLimits(max_sequents=50),
+      statistics, NullLog())
+    self.assertIsNone(result)
+    self.assertEqual(statistics.sequents, 51)
+    self.assertEqual(statistics.exhausted, 'limit of 50 sequents reached')
+
+  def testPortfolioWithProcesses(self):
+    with self.assertRaises(ValueError):
+      proveFormula([], parseText('P(a) implies P(a)'), None, None, NullLog(),
+        processes=2, strategy=PORTFOLIO, propositional=False)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+# checks the persistent map against a dict under random updates, including
+# keys whose hashes collide in part or in full, and checks that the maps
+# left behind by updates never change
+
+from persistent import *
+import random
+import unittest
+
+# a key with a chosen hash, so that collisions can be forced
+class Key:
+  def __init__(self, name, key_hash):
+    self.name = name
+    self.key_hash = key_hash
+
+  def __eq__(self, other):
+    return isinstance(other, Key) and self.name == other.name
+
+  def __hash__(self):
+    return self.key_hash
+
+  def __repr__(self):
+    return 'Key(%r, %r)' % (self.name, self.key_hash)
+
+def checkMap(test, persistent, expected):
+  test.assertEqual(len(persistent), len(expected))
+  test.assertEqual(dict(persistent.items()), expected)
+  test.assertEqual(set(persistent), set(expected))
+  for key, value in expected.items():
+    test.assertIn(key, persistent)
+    test.assertIs(persistent[key], value)
+    test.assertIs(persistent.get(key), value)
+
+class PersistentMapTest(unittest.TestCase):
+  # runs random updates over keys whose hashes are drawn from hashes,
+  # checking each map as it is made and again once all the updates are done
+  def randomUpdates(self, hashes, seed, steps=600, names=60):
+    generator = random.Random(seed)
+    keys = [Key(name, generator.choice(hashes)) for name in range(names)]
+    persistent = PersistentMap()
+    expected = {}
+    snapshots = []
+    for step in range(steps):
+      key = generator.choice(keys)
+      if key in expected and generator.random() < 0.4:
+        persistent = persistent.delete(key)
+        del expected[key]
+      else:
+        value = object()
+        persistent = persistent.set(key, value)
+        expected[key] = value
+      checkMap(self, persistent, expected)
+      snapshots.append((persistent, dict(expected)))
+    for snapshot, snapshot_expected in snapshots:
+      self.assertEqual(len(snapshot), len(snapshot_expected))
+      self.assertEqual(dict(snapshot.items()), snapshot_expected)
+    # empty the map again, merging the nodes back together
+    for key in list(expected):
+      persistent = persistent.delete(key)
+      del expected[key]
+      checkMap(self, persistent, expected)
+    self.assertIs(persistent.root, EMPTY_NODE)
+
+  def testDistinctHashes(self):
+    self.randomUpdates(range(1 << 20), 0)
+
+  # hashes which share their low bits split into deep chains of nodes
+  def testSharedPrefixes(self):
+    self.randomUpdates([index << 40 for index in range(64)] +
+      [(index << 40) | 7 for index in range(64)], 1)
+
+  # equal hashes go into collision nodes
+  def testFullCollisions(self):
+    self.randomUpdates([0, 1, -1, 1 << 35, (1 << 35) | 1], 2)
+
+  def testNegativeAndLargeHashes(self):
+    self.randomUpdates([-index for index in range(50)] +
+      [(1 << 63) - index for index in range(50)], 3)
+
+  def testCollisionNodeSplits(self):
+    key_a = Key('a', 5)
+    key_b = Key('b', 5)
+    key_c = Key('c', 5 | (1 << 10))
+    persistent = PersistentMap([(key_a, 1), (key_b, 2)])
+    self.assertIsInstance(persistent.root.entries[0], CollisionNode)
+    persistent = persistent.set(key_c, 3)
+    checkMap(self, persistent, { key_a: 1, key_b: 2, key_c: 3 })
+    persistent = persistent.delete(key_a)
+    checkMap(self, persistent, { key_b: 2, key_c: 3 })
+
+  def testSetSameValue(self):
+    value = object()
+    persistent = PersistentMap([(Key('a', 1), value)])
+    self.assertIs(persistent.set(Key('a', 1), value), persistent)
+
+  def testDeleteMissingKey(self):
+    persistent = PersistentMap([(Key('a', 1), 1), (Key('b', 1), 2)])
+    with self.assertRaises(KeyError):
+      persistent.delete(Key('c', 1))
+    with self.assertRaises(KeyError):
+      persistent.delete(Key('d', 2))
+    with self.assertRaises(KeyError):
+      PersistentMap().delete(Key('a', 1))
+    checkMap(self, persistent, { Key('a', 1): 1, Key('b', 1): 2 })
+
+  def testMissingKey(self):
+    persistent = PersistentMap([(Key('a', 1), None)])
+    self.assertIsNone(persistent[Key('a', 1)])
+    self.assertNotIn(Key('b', 1), persistent)
+    self.assertEqual(persistent.get(Key('b', 1), 'default'), 'default')
+    with self.assertRaises(KeyError):
+      persistent[Key('b', 1)]
+
+class PersistentHeapTest(unittest.TestCase):
+  def testOrder(self):
+    generator = random.Random(4)
+    items = [generator.randrange(100) for index in range(500)]
+    heap = PersistentHeap()
+    for item in items:
+      heap = heap.push(item)
+    popped = []
+    old_heap = heap
+    while heap:
+      popped.append(heap.peek())
+      heap = heap.pop()
+    self.assertEqual(popped, sorted(items))
+    self.assertEqual(old_heap.peek(), min(items))
+    self.assertIsNone(heap.peek())
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+# checks that the sequent search keeps to its limits, including while it
+# searches for a unifier which closes a group of siblings, and that the
+# search for that unifier tries the lists with the fewest choices first;
+# also checks the order in which the formulae of a sequent are visited
+
+from prover import *
+import time
+import unittest
+
+# lists of equations whose first choices all fail at the last list, so the
+# choices are searched through chronologically; nothing solves them
+def hardChoices(size):
+  pair_lists = []
+  for index in range(size):
+    term = UnificationTerm('X%d' % index)
+    pair_lists.append([(term, Function('a', [])), (term, Function('b', []))])
+  term = UnificationTerm('X0')
+  pair_lists.append([(term, Function('c', [])), (term, Function('d', []))])
+  return pair_lists
+
+class LimitsTest(unittest.TestCase):
+  def testUnificationLimit(self):
+    statistics = SearchStatistics()
+    statistics.sequents = 10
+    self.assertIsNone(unify_choices(hardChoices(20), {}, statistics,
+      ResourceLimits(max_sequents=5, max_unifications=None),
+      time.monotonic()))
+    self.assertEqual(statistics.exhausted, 'limit of 5 sequents reached')
+    self.assertEqual(statistics.unifications,
+      ResourceLimits.unification_interval)
+
+  def testUnificationWithoutLimit(self):
+    statistics = SearchStatistics()
+    self.assertIsNone(unify_choices(hardChoices(10), {}, statistics))
+    self.assertIsNone(statistics.exhausted)
+    self.assertGreater(statistics.unifications, 2 ** 10)
+
+  # a search which once spent minutes on the unifiers of a single group
+  def testSearchTimeout(self):
+    statistics = SearchStatistics()
+    start = time.monotonic()
+    result,log = proveFormula([
+      ForAll(Variable('x'), Implies(Predicate('P', [Variable('x')]),
+        Predicate('P', [Function('f', [Variable('x')])]))),
+      Predicate('P', [Function('a', [])])],
+      Predicate('P', [Function('f', [Function('f', [Function('a', [])])])]),
+      ResourceLimits(timeout=0.5), statistics, NullLog(),
+      propositional=False)
+    self.assertIn(result, [True, None])
+    self.assertLess(time.monotonic() - start, 5)
+
+  def testAbandonedClosure(self):
+    statistics = SearchStatistics()
+    self.assertIsNone(unify_choices(hardChoices(20), {}, statistics,
+      ResourceLimits(max_unifications=100), time.monotonic()))
+    self.assertIsNone(statistics.exhausted)
+    self.assertEqual(statistics.unifications, 100)
+    self.assertEqual(statistics.closures_abandoned, 1)
+
+  # the list with a single choice goes first, so its failure is found
+  # before the other lists are combined
+  def testFewestChoicesFirst(self):
+    pair_lists = hardChoices(20)
+    pair_lists[-1] = pair_lists[-1][:1]
+    statistics = SearchStatistics()
+    self.assertIsNone(unify_choices(pair_lists, {}, statistics))
+    self.assertLess(statistics.unifications, 10)
+
+def atom(name, *terms):
+  return Predicate(name, [Function(term, []) for term in terms])
+
+class FormulaMapTest(unittest.TestCase):
+  def testFirstShared(self):
+    left = FormulaMap({ atom('P', 'c'): 0, atom('Q', 'a'): 0,
+      atom('R', 'a'): 0 })
+    right = FormulaMap({ atom('R', 'a'): 0, atom('Q', 'a'): 0 })
+    self.assertEqual(left.firstShared(right), atom('Q', 'a'))
+    self.assertEqual(right.firstShared(left), atom('R', 'a'))
+    del left[atom('Q', 'a')]
+    self.assertEqual(left.firstShared(right), atom('R', 'a'))
+    self.assertIsNone(left.firstShared(FormulaMap()))
+
+  # the pairs follow the order of the formulae on the left, then the right
+  def testUnifiablePairs(self):
+    term = UnificationTerm('t1')
+    left = FormulaMap({ atom('Q', 'a'): 0, Predicate('P', [term]): 0,
+      atom('P', 'a'): 0, atom('R', 'a', 'b'): 0 })
+    right = FormulaMap({ atom('P', 'b'): 0, atom('P', 'a'): 0,
+      atom('R', 'a'): 0 })
+    sequent = Sequent(left, right, set(), 1, { term: 1 })
+    statistics = SearchStatistics()
+    self.assertEqual(sequent.getUnifiablePairs(statistics), [
+      (Predicate('P', [term]), atom('P', 'b')),
+      (Predicate('P', [term]), atom('P', 'a')),
+      (atom('P', 'a'), atom('P', 'a'))])
+    # P(a) and P(b) are the only equation to fail; the pairs are kept
+    self.assertEqual(statistics.unifications, 4)
+    self.assertEqual(statistics.unification_failures, 1)
+    sequent.getUnifiablePairs(statistics)
+    self.assertEqual(statistics.unifications, 4)
+
+  # the order of the formulae survives changes of depth
+  def testOrder(self):
+    formulae = FormulaMap({ atom('P', 'a'): 0, atom('Q', 'a'): 0 })
+    formulae[atom('P', 'a')] = 2
+    formulae[atom('R', 'a')] = 1
+    self.assertEqual(list(formulae),
+      [atom('P', 'a'), atom('Q', 'a'), atom('R', 'a')])
+    self.assertEqual(formulae.items(),
+      [(atom('P', 'a'), 2), (atom('Q', 'a'), 0), (atom('R', 'a'), 1)])
+
+if __name__ == '__main__':
+  unittest.main()
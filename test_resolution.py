@@ -0,0 +1,74 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+# checks that resolution agrees with the sequent calculus on the examples of
+# README.md and on small first-order problems; the sequent calculus cannot
+# refute most invalid first-order formulae (it instantiates forever), so
+# there it may give up, but it must never disagree
+
+from prover import *
+from resolution import proveResolution
+from benchmark import readmeProblems
+from TheoremProver import parseText
+import unittest
+
+VALID = [
+  ([], '(forall x. P(x)) implies P(a)'),
+  ([], 'P(a) implies exists x. P(x)'),
+  ([], 'forall x. P(x) implies exists y. P(y)'),
+  ([], '(exists x. forall y. R(x, y)) implies forall y. exists x. R(x, y)'),
+  ([], '(forall x. P(x) and Q(x)) implies (forall x. P(x)) and ' \
+    '(forall x. Q(x))'),
+  ([], '(not exists x. P(x)) implies forall x. not P(x)'),
+  ([], '(forall x. P(x) implies Q(x)) implies ((exists x. P(x)) implies ' \
+    'exists x. Q(x))'),
+  ([], 'exists x. forall y. (P(x) implies P(y))'),
+  (['forall x. P(x) implies P(f(x))', 'P(a)'], 'P(f(a))'),
+  (['forall x. forall y. R(x, y) implies R(y, x)', 'R(a, b)'], 'R(b, a)'),
+  (['forall x. P(x) implies Q(x)', 'not Q(a)'], 'not P(a)'),
+]
+
+INVALID = [
+  ([], '(exists x. P(x)) implies forall x. P(x)'),
+  ([], 'P(a) implies P(b)'),
+  ([], '(exists x. P(x)) and (exists x. Q(x)) implies ' \
+    'exists x. P(x) and Q(x)'),
+  (['forall x. P(x) implies Q(x)'], 'forall x. Q(x) implies P(x)'),
+  (['forall x. R(x, x)'], 'forall x. forall y. R(x, y)'),
+  (['exists x. P(x)', 'exists x. not P(x)'], 'P(a)'),
+]
+
+def limits():
+  return ResourceLimits(max_sequents=200, timeout=1)
+
+def proveSequentCalculus(axioms, formula):
+  result,log = proveFormula(axioms, formula, limits(), None, NullLog(),
+    propositional=False)
+  return result
+
+class ResolutionTest(unittest.TestCase):
+  def testReadmeExamples(self):
+    for family, name, axioms, formula, expected in readmeProblems():
+      result = proveResolution(axioms, formula, limits())
+      self.assertIsNotNone(result, name)
+      self.assertEqual(result, proveSequentCalculus(axioms, formula), name)
+
+  def testValid(self):
+    for axioms, formula in VALID:
+      axioms = [parseText(axiom) for axiom in axioms]
+      formula = parseText(formula)
+      self.assertIs(proveResolution(axioms, formula, limits()), True,
+        formula)
+      self.assertIs(proveSequentCalculus(axioms, formula), True, formula)
+
+  def testInvalid(self):
+    for axioms, formula in INVALID:
+      axioms = [parseText(axiom) for axiom in axioms]
+      formula = parseText(formula)
+      self.assertIs(proveResolution(axioms, formula, limits()), False,
+        formula)
+      self.assertIn(proveSequentCalculus(axioms, formula), [False, None],
+        formula)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+# checks the CDCL solver and the propositional prover against truth tables
+# on small random problems, so that a change to the watched literals, the
+# learned clauses or the backjumping which loses a model (or finds a wrong
+# one) shows up here
+
+from sat import *
+from prover import proveFormula, SearchStatistics, NullLog, ProofLog, \
+  ProofTree
+import itertools
+import random
+import unittest
+
+def satisfies(assignment, clauses):
+  return all(any((literal > 0) == assignment[abs(literal) - 1]
+    for literal in clause) for clause in clauses)
+
+def bruteForce(variables, clauses):
+  return any(satisfies(assignment, clauses)
+    for assignment in itertools.product([False, True], repeat=variables))
+
+def randomClauses(generator, variables, clauses, width):
+  return [[generator.choice([1, -1]) * generator.randint(1, variables)
+    for index in range(generator.randint(1, width))]
+    for clause in range(clauses)]
+
+def solveClauses(variables, clauses):
+  solver = Solver()
+  for variable in range(variables):
+    solver.newVariable()
+  for clause in clauses:
+    solver.addClause(clause)
+  return solver, solver.solve()
+
+# the truth value of a propositional formula, with each predicate looked up
+# in the assignment
+def evaluate(formula, assignment):
+  if isinstance(formula, Predicate):
+    return assignment[formula]
+  if isinstance(formula, Not):
+    return not evaluate(formula.formula, assignment)
+  value_a = evaluate(formula.formula_a, assignment)
+  value_b = evaluate(formula.formula_b, assignment)
+  if isinstance(formula, And):
+    return value_a and value_b
+  if isinstance(formula, Or):
+    return value_a or value_b
+  return not value_a or value_b
+
+ATOMS = [Predicate(name, []) for name in 'PQRS'] + \
+  [Predicate('T', [Function('a', [])])]
+
+def randomFormula(generator, depth):
+  if depth == 0 or generator.random() < 0.25:
+    return generator.choice(ATOMS)
+  kind = generator.randint(0, 3)
+  if kind == 0:
+    return Not(randomFormula(generator, depth - 1))
+  return [And, Or, Implies][kind - 1](randomFormula(generator, depth - 1),
+    randomFormula(generator, depth - 1))
+
+class SolverTest(unittest.TestCase):
+  def testRandomClauses(self):
+    generator = random.Random(0)
+    for trial in range(1500):
+      variables = generator.randint(1, 8)
+      clauses = randomClauses(generator, variables,
+        generator.randint(0, 40), 4)
+      solver, result = solveClauses(variables, clauses)
+      self.assertEqual(result, bruteForce(variables, clauses), clauses)
+      if result:
+        self.assertTrue(satisfies(solver.model(), clauses), clauses)
+
+  # random 3-SAT near the threshold needs many conflicts, learned clauses
+  # and restarts, though it is too large for a truth table
+  def testRandomThreeSat(self):
+    generator = random.Random(1)
+    for trial in range(10):
+      clauses = [[generator.choice([1, -1]) * generator.randint(1, 60)
+        for index in range(3)] for clause in range(256)]
+      solver, result = solveClauses(60, clauses)
+      if result:
+        self.assertTrue(satisfies(solver.model(), clauses))
+
+  # n + 1 pigeons in n holes
+  def testPigeonhole(self):
+    for holes in range(1, 6):
+      solver = Solver()
+      variables = {}
+      for pigeon in range(holes + 1):
+        for hole in range(holes):
+          variables[pigeon, hole] = solver.newVariable()
+      for pigeon in range(holes + 1):
+        solver.addClause([variables[pigeon, hole] for hole in range(holes)])
+      for hole in range(holes):
+        for pigeon_a in range(holes + 1):
+          for pigeon_b in range(pigeon_a + 1, holes + 1):
+            solver.addClause([-variables[pigeon_a, hole],
+              -variables[pigeon_b, hole]])
+      self.assertFalse(solver.solve(), holes)
+
+  def testLuby(self):
+    self.assertEqual([luby(index) for index in range(15)],
+      [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8])
+
+class PropositionalTest(unittest.TestCase):
+  def testRandomFormulae(self):
+    generator = random.Random(2)
+    assignments = [dict(zip(ATOMS, values))
+      for values in itertools.product([False, True], repeat=len(ATOMS))]
+    for trial in range(400):
+      axioms = [randomFormula(generator, 3)
+        for index in range(generator.randint(0, 3))]
+      formula = randomFormula(generator, 4)
+      expected = all(evaluate(formula, assignment)
+        for assignment in assignments
+        if all(evaluate(axiom, assignment) for axiom in axioms))
+      self.assertEqual(provePropositional(axioms, formula), expected,
+        (axioms, formula))
+
+  # the solver has no proof to show, so a log which keeps one gets a search
+  def testLoggedQueries(self):
+    axioms = [Implies(ATOMS[0], ATOMS[1]), ATOMS[0]]
+    statistics = SearchStatistics()
+    result,log = proveFormula(axioms, ATOMS[1], None, statistics, NullLog())
+    self.assertTrue(result)
+    self.assertEqual(statistics.sequents, 0)
+    self.assertEqual(statistics.engine, 'sat')
+    statistics = SearchStatistics()
+    result,log = proveFormula(axioms, ATOMS[1], None, statistics, NullLog(),
+      propositional=False)
+    self.assertTrue(result)
+    self.assertEqual(statistics.engine, 'sequent')
+    for log in [ProofLog(False), ProofTree()]:
+      statistics = SearchStatistics()
+      result,log = proveFormula(axioms, ATOMS[1], None, statistics, log)
+      self.assertTrue(result)
+      self.assertGreater(statistics.sequents, 0)
+      self.assertEqual(statistics.engine, 'sequent')
+      self.assertGreater(len(list(log)), 0)
+
+if __name__ == '__main__':
+  unittest.main()
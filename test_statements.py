@@ -0,0 +1,29 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+# checks that a statement which cannot be run is reported with the offset in
+# the statement where it goes wrong
+
+from TheoremProver import *
+import unittest
+
+class StatementTest(unittest.TestCase):
+  def testErrorOffsets(self):
+    for statement, line in [
+      ('P and', 'Missing formula in AND connective. (at offset 5)'),
+      ('axiom (P or Q', 'Missing \')\'. (at offset 13)'),
+      ('lemma P axiom', 'Unexpected keyword: axiom. (at offset 8)'),
+      ('axioms foo', 'Unexpected: foo. (at offset 7)'),
+      ('forall x P(x)', 'Missing \'.\' in FORALL quantifier. (at offset 9)'),
+    ]:
+      self.assertEqual(list(proveStream([statement])), [line])
+
+  def testErrorPosition(self):
+    with self.assertRaises(InvalidInputError) as context:
+      statementLines('axiom P(a) implies', KnowledgeBase())
+    self.assertEqual(context.exception.position, 18)
+    self.assertEqual(context.exception.message,
+      'Missing formula in IMPLIES connective.')
+
+if __name__ == '__main__':
+  unittest.main()
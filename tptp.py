@@ -0,0 +1,330 @@
+#!/usr/bin/python -O
+# -*- coding: utf-8 -*-
+
+from language import *
+import os
+import re
+
+##############################################################################
+# Problems
+##############################################################################
+
+# the annotated formulae of a TPTP problem, sorted by role; status is the
+# SZS status given in the header of the file (e.g. Theorem), if there is one
+class Problem:
+  def __init__(self, name=None):
+    self.name = name
+    self.axioms = []
+    self.conjectures = []
+    self.negated_conjectures = []
+    self.status = None
+
+  # the formula to prove from the axioms: the conjunction of the conjectures
+  # or the negation of the conjunction of the negated conjectures, or FALSE
+  # (the axioms are inconsistent) if there are neither
+  def goal(self):
+    if len(self.conjectures) > 0:
+      return conjunction(self.conjectures)
+    if len(self.negated_conjectures) > 0:
+      return Not(conjunction(self.negated_conjectures))
+    return FALSE
+
+def conjunction(formulae):
+  formula = formulae[-1]
+  for other in reversed(formulae[:-1]):
+    formula = And(other, formula)
+  return formula
+
+# the roles whose formulae are assumed
+AXIOM_ROLES = ['axiom', 'hypothesis', 'definition', 'assumption', 'lemma',
+  'theorem', 'corollary', 'plain']
+
+# there are no truth constants, so TRUE is an instance of excluded middle
+TRUE = Or(Predicate('$true', []), Not(Predicate('$true', [])))
+FALSE = Not(TRUE)
+
+##############################################################################
+# Lexical analysis
+##############################################################################
+
+# whitespace and comments are skipped; words are lower and upper words,
+# dollar words and numbers, and quoted and distinct objects keep their quotes
+TPTP_PATTERN = re.compile(r'''
+  (?P<skip>\s+|%[^\n]*|/\*.*?\*/)
+  |(?P<quoted>'(?:[^'\\]|\\.)*')
+  |(?P<distinct>"(?:[^"\\]|\\.)*")
+  |(?P<number>[+-]?[0-9]+(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?(?:/[0-9]+)?)
+  |(?P<word>\$?\$?[A-Za-z0-9_]+)
+  |(?P<symbol><=>|<~>|=>|<=|~\||~&|!=|[(),.\[\]:!?~&|=])
+  ''', re.VERBOSE | re.DOTALL)
+
+STATUS_PATTERN = re.compile(r'^%\s*Status\s*:\s*(\w+)', re.MULTILINE)
+
+# the (kind, text, offset) of each token in the text
+def tokenizeTPTP(text):
+  position = 0
+  while position < len(text):
+    match = TPTP_PATTERN.match(text, position)
+    if match is None:
+      raise ValueError('Unexpected character at line %d: %s' %
+        (lineNumber(text, position), text[position]))
+    if match.lastgroup != 'skip':
+      yield match.lastgroup, match.group(), position
+    position = match.end()
+
+def lineNumber(text, position):
+  return text.count('\n', 0, position) + 1
+
+##############################################################################
+# Parsing
+##############################################################################
+
+# connectives which take exactly two operands
+BINARY_CONNECTIVES = {
+  '=>': lambda formula_a, formula_b: Implies(formula_a, formula_b),
+  '<=': lambda formula_a, formula_b: Implies(formula_b, formula_a),
+  '<=>': lambda formula_a, formula_b: equivalence(formula_a, formula_b),
+  '<~>': lambda formula_a, formula_b: Not(equivalence(formula_a, formula_b)),
+  '~|': lambda formula_a, formula_b: Not(Or(formula_a, formula_b)),
+  '~&': lambda formula_a, formula_b: Not(And(formula_a, formula_b))
+}
+
+# connectives which take two or more operands, grouped to the left
+ASSOCIATIVE_CONNECTIVES = { '|': Or, '&': And }
+
+def equivalence(formula_a, formula_b):
+  return And(Implies(formula_a, formula_b), Implies(formula_b, formula_a))
+
+# reads the annotated formulae of a TPTP file into a problem; includes are
+# looked for next to the file that includes them and then under root (the
+# TPTP environment variable by default); equality is read as the predicate
+# =, with no axioms for it, and distinct objects are constants which are not
+# known to be distinct
+class TPTPParser:
+  def __init__(self, text, problem, directory, root):
+    self.text = text
+    self.tokens = tokenizeTPTP(text)
+    self.problem = problem
+    self.directory = directory
+    self.root = root
+    self.advance()
+
+  def advance(self):
+    self.kind, self.token, self.position = next(self.tokens,
+      (None, None, len(self.text)))
+
+  def next(self):
+    token = self.token
+    self.advance()
+    return token
+
+  def error(self, message):
+    found = 'the end of the input' if self.token is None else self.token
+    return ValueError('%s at line %d, found %s.' % (message,
+      lineNumber(self.text, self.position), found))
+
+  def expect(self, token):
+    if self.token != token:
+      raise self.error('Expected %s' % token)
+    self.advance()
+
+  # the annotated formulae and includes up to the end of the input; if a
+  # selection of names is given, only the formulae named in it are kept
+  def parseInput(self, selection=None):
+    while self.token is not None:
+      if self.token not in ['fof', 'cnf', 'include']:
+        raise self.error('Expected fof, cnf or include')
+      language = self.next()
+      self.expect('(')
+      if language == 'include':
+        self.parseInclude()
+      else:
+        self.parseAnnotatedFormula(selection)
+      self.expect(')')
+      self.expect('.')
+
+  def parseInclude(self):
+    if self.kind != 'quoted':
+      raise self.error('Expected a file name')
+    path = unquote(self.next())
+    selection = None
+    if self.token == ',':
+      self.advance()
+      self.expect('[')
+      selection = set()
+      while self.token != ']':
+        selection.add(self.parseName())
+        if self.token != ']':
+          self.expect(',')
+      self.advance()
+    for directory in [self.directory, self.root]:
+      if directory is not None and \
+        os.path.isfile(os.path.join(directory, path)):
+        path = os.path.join(directory, path)
+        break
+    with open(path, encoding='utf-8') as source:
+      text = source.read()
+    parser = TPTPParser(text, self.problem, os.path.dirname(path), self.root)
+    parser.parseInput(selection)
+
+  def parseName(self):
+    if self.kind == 'quoted':
+      return unquote(self.next())
+    if self.kind == 'word' or self.kind == 'number':
+      return self.next()
+    raise self.error('Expected a name')
+
+  def parseAnnotatedFormula(self, selection):
+    name = self.parseName()
+    self.expect(',')
+    role = self.parseName()
+    self.expect(',')
+    formula = universalClosure(self.parseFormula())
+    # skip the source and useful information
+    depth = 0
+    while depth > 0 or self.token != ')':
+      if self.token is None:
+        raise self.error('Expected )')
+      if self.token == '(' or self.token == '[':
+        depth += 1
+      elif self.token == ')' or self.token == ']':
+        depth -= 1
+      self.advance()
+    if selection is not None and name not in selection:
+      return
+    if role in AXIOM_ROLES:
+      self.problem.axioms.append(formula)
+    elif role == 'conjecture':
+      self.problem.conjectures.append(formula)
+    elif role == 'negated_conjecture':
+      self.problem.negated_conjectures.append(formula)
+    else:
+      raise self.error('Unsupported role %s' % role)
+
+  # a binary formula or a unit formula; connectives may not be mixed without
+  # parentheses, so there are no precedences
+  def parseFormula(self):
+    formula = self.parseUnitFormula()
+    if self.token in BINARY_CONNECTIVES:
+      connective = BINARY_CONNECTIVES[self.next()]
+      formula = connective(formula, self.parseUnitFormula())
+    elif self.token in ASSOCIATIVE_CONNECTIVES:
+      token = self.token
+      connective = ASSOCIATIVE_CONNECTIVES[token]
+      while self.token == token:
+        self.advance()
+        formula = connective(formula, self.parseUnitFormula())
+    if self.token in BINARY_CONNECTIVES or \
+      self.token in ASSOCIATIVE_CONNECTIVES:
+      raise self.error('Expected parentheses around a binary formula')
+    return formula
+
+  def parseUnitFormula(self):
+    if self.token == '~':
+      self.advance()
+      return Not(self.parseUnitFormula())
+    if self.token == '!' or self.token == '?':
+      quantifier = ForAll if self.next() == '!' else ThereExists
+      self.expect('[')
+      variables = [self.parseVariable()]
+      while self.token == ',':
+        self.advance()
+        variables.append(self.parseVariable())
+      self.expect(']')
+      self.expect(':')
+      formula = self.parseUnitFormula()
+      for variable in reversed(variables):
+        formula = quantifier(variable, formula)
+      return formula
+    if self.token == '(':
+      self.advance()
+      formula = self.parseFormula()
+      self.expect(')')
+      return formula
+    return self.parseAtom()
+
+  def parseVariable(self):
+    if self.kind != 'word' or not self.token[0].isupper():
+      raise self.error('Expected a variable')
+    return Variable(self.next())
+
+  def parseAtom(self):
+    if self.token == '$true':
+      self.advance()
+      return TRUE
+    if self.token == '$false':
+      self.advance()
+      return FALSE
+    term = self.parseTerm()
+    if self.token == '=' or self.token == '!=':
+      positive = self.next() == '='
+      atom = Predicate('=', [term, self.parseTerm()])
+      return atom if positive else Not(atom)
+    if not isinstance(term, Function):
+      raise self.error('Expected a predicate')
+    return Predicate(term.name, term.terms)
+
+  def parseTerm(self):
+    if self.kind == 'word' and self.token[0].isupper():
+      return Variable(self.next())
+    if self.kind is None or self.kind == 'symbol':
+      raise self.error('Expected a term')
+    kind = self.kind
+    name = self.next()
+    if kind == 'quoted':
+      name = unquote(name)
+    terms = []
+    if self.token == '(':
+      self.advance()
+      terms.append(self.parseTerm())
+      while self.token == ',':
+        self.advance()
+        terms.append(self.parseTerm())
+      self.expect(')')
+    return Function(name, terms)
+
+def unquote(token):
+  return re.sub(r'\\(.)', r'\1', token[1:-1])
+
+# bind the free variables of a formula (the variables of a clause) with
+# universal quantifiers, in the order they occur
+def universalClosure(formula):
+  variables = []
+  freeVariablesInOrder(formula, set(), variables)
+  for variable in reversed(variables):
+    formula = ForAll(variable, formula)
+  return formula
+
+def freeVariablesInOrder(node, bound, variables):
+  if isinstance(node, Variable):
+    if node not in bound and node not in variables:
+      variables.append(node)
+  elif isinstance(node, Function) or isinstance(node, Predicate):
+    for term in node.terms:
+      freeVariablesInOrder(term, bound, variables)
+  elif isinstance(node, Not):
+    freeVariablesInOrder(node.formula, bound, variables)
+  elif isinstance(node, ForAll) or isinstance(node, ThereExists):
+    freeVariablesInOrder(node.formula, bound | set([node.variable]),
+      variables)
+  else:
+    freeVariablesInOrder(node.formula_a, bound, variables)
+    freeVariablesInOrder(node.formula_b, bound, variables)
+
+# the problem in a string of TPTP; directory is where includes are looked
+# for first
+def parseTPTP(text, name=None, directory=None, root=None):
+  if root is None:
+    root = os.environ.get('TPTP')
+  problem = Problem(name)
+  status = STATUS_PATTERN.search(text)
+  if status is not None:
+    problem.status = status.group(1)
+  TPTPParser(text, problem, directory, root).parseInput()
+  return problem
+
+def readTPTP(path, root=None):
+  with open(path, encoding='utf-8') as source:
+    text = source.read()
+  name = os.path.splitext(os.path.basename(path))[0]
+  return parseTPTP(text, name, os.path.dirname(path), root)